@@ -0,0 +1,237 @@
+import argparse
+import glob
+import sys
+from time import perf_counter
+
+import numpy as np
+
+from game import Game, Status
+from game_world.racetrack import RaceTrack, load_track
+from game_world.track_generator import generate_track
+
+# Why a racer stopped, indexing BatchGame.reason
+RACING, FINISHED, ILLEGAL_MOVE, OUT_OF_BOUNDS, HIT_WALL, DAWDLED = range(6)
+MOVES = np.array([(1, 0), (-1, 0), (0, 1), (0, -1), (0, 0)])
+TRACK = "tracks/time_saver.pkl"
+# what --check compares against Game by default: every bundled track, plus generated
+# tracks (with their default gates and traps) from these seeds
+CHECK_TRACKS = "tracks/*.pkl"
+CHECK_SEEDS = [0, 1]
+CHECK_SHAPE = (20, 20)  # small, so random racers reach the buttons
+
+
+class BatchGame:
+    """
+    N racers on copies of the same track, advanced in lockstep with numpy.
+
+    Each racer has its own position and toggle state (as a bitmask, see RaceTrack.state),
+    and step() follows the same rules in the same order as Game.tick: illegal moves,
+    pressing the button being left, bounds, walls, dawdling, then the finish line.
+    There's no player call, so there's no time budget and nothing can crash or time out.
+    """
+
+    def __init__(
+        self, track: RaceTrack, n: int, max_turns_without_progress: int = 100
+    ) -> None:
+        self.track = track.snapshot()
+        self.n = n
+        self.max_turns_without_progress = max_turns_without_progress
+        self.pos = np.tile(np.array(track.spawn, dtype=np.int64), (n, 1))
+        self.state = np.full(n, track.state, dtype=np.int64)
+        self.status = np.full(n, Status.ONGOING.value, dtype=np.int8)
+        self.reason = np.full(n, RACING, dtype=np.int8)
+        self.steps = np.zeros(n, dtype=np.int64)
+        self.min_dist = np.full(n, np.iinfo(np.int64).max, dtype=np.int64)
+        self.turns_without_progress = np.zeros(n, dtype=np.int64)
+        self.last_action = np.zeros((n, 2), dtype=np.int64)
+        self.target = np.array(track.target, dtype=np.int64)
+        self._base_state = track.state
+        self._wall_bits = np.left_shift(1, track.wall_colors.astype(np.int64))
+        self._button_bits = np.where(
+            track.buttons, np.left_shift(1, track.button_colors.astype(np.int64)), 0
+        )
+
+    def ongoing(self) -> np.ndarray:
+        return self.status == Status.ONGOING.value
+
+    def step(self, actions: np.ndarray) -> np.ndarray:
+        """
+        Make every racer still on the track take one move.
+
+        Args:
+            actions (np.ndarray): An (n, 2) int array of (row, col) moves. Rows for racers
+                that have already stopped are ignored.
+
+        Returns:
+            np.ndarray: The status (a Status value) of every racer afterwards.
+        """
+        actions = np.asarray(actions, dtype=np.int64)
+        racing = np.flatnonzero(self.ongoing())
+        action = actions[racing]
+        self.steps[racing] += 1
+        self.last_action[racing] = action
+
+        legal = np.abs(action).sum(axis=1) <= 1
+        self._stop(racing[~legal], ILLEGAL_MOVE)
+        racing, action = racing[legal], action[legal]
+
+        rows, cols = self.pos[racing, 0], self.pos[racing, 1]
+        self.state[racing] ^= self._button_bits[rows, cols]
+        new_pos = self.pos[racing] + action
+        self.pos[racing] = new_pos
+        rows, cols = new_pos[:, 0], new_pos[:, 1]
+
+        rows_in, cols_in = self.track.shape
+        inside = (rows >= 0) & (rows < rows_in) & (cols >= 0) & (cols < cols_in)
+        self._stop(racing[~inside], OUT_OF_BOUNDS)
+        racing, rows, cols = racing[inside], rows[inside], cols[inside]
+
+        toggled = ((self.state[racing] ^ self._base_state) & self._wall_bits[rows, cols]) != 0
+        active = self.track.active[rows, cols] ^ toggled
+        clear = ~self.track.walls[rows, cols] | ~active
+        self._stop(racing[~clear], HIT_WALL)
+        racing, rows, cols = racing[clear], rows[clear], cols[clear]
+
+        dist = np.abs(rows - self.target[0]) + np.abs(cols - self.target[1])
+        progress = dist < self.min_dist[racing]
+        self.min_dist[racing] = np.where(progress, dist, self.min_dist[racing])
+        self.turns_without_progress[racing] = np.where(
+            progress, 0, self.turns_without_progress[racing] + 1
+        )
+        dawdled = self.turns_without_progress[racing] >= self.max_turns_without_progress
+        self._stop(racing[dawdled], DAWDLED)
+        racing, dist = racing[~dawdled], dist[~dawdled]
+
+        finished = racing[dist == 0]
+        self.status[finished] = Status.FINISH.value
+        self.reason[finished] = FINISHED
+        return self.status
+
+    def _stop(self, racers: np.ndarray, reason: int) -> None:
+        self.status[racers] = Status.DNF.value
+        self.reason[racers] = reason
+
+    def result(self, i: int) -> tuple[Status, str]:
+        """Racer i's status and the message Game.tick would have given for it."""
+        reason = self.reason[i]
+        if reason == RACING:
+            return Status.ONGOING, "Still racing."
+        if reason == FINISHED:
+            return Status.FINISH, f"Racer made it to the finish line in {self.steps[i]} steps!"
+        if reason == ILLEGAL_MOVE:
+            action = tuple(int(a) for a in self.last_action[i])
+            return Status.DNF, f"Racer made illegal move {action}!"
+        if reason == OUT_OF_BOUNDS:
+            return Status.DNF, "Racer went out of bounds!"
+        if reason == HIT_WALL:
+            return Status.DNF, "Racer crashed into a wall!"
+        return Status.DNF, f"Racer spent {self.turns_without_progress[i]} ticks dawdling!"
+
+    def play(self, policy, max_steps: int = 10_000) -> np.ndarray:
+        """
+        Step until every racer has stopped (or max_steps), asking policy(game) for each
+        step's (n, 2) actions.
+
+        Returns:
+            np.ndarray: The final status of every racer.
+        """
+        for _ in range(max_steps):
+            if not self.ongoing().any():
+                break
+            self.step(policy(self))
+        return self.status
+
+
+def random_policy(rng: np.random.Generator, illegal: float = 0.0):
+    """A policy making uniformly random moves, and occasionally an illegal (2, 0)."""
+
+    def policy(game: BatchGame) -> np.ndarray:
+        actions = MOVES[rng.integers(len(MOVES), size=game.n)]
+        actions[rng.random(game.n) < illegal] = (2, 0)
+        return actions
+
+    return policy
+
+
+def check_against_game(
+    track: RaceTrack, n: int = 200, max_steps: int = 300, seed: int = 0
+) -> int:
+    """
+    Play random racers through both BatchGame and the scalar Game and compare them.
+
+    Returns:
+        int: How many racers finished with a different status, message, step count or position.
+    """
+    rng = np.random.default_rng(seed)
+    batch = BatchGame(track, n)
+    chosen = []
+
+    def recording_policy(game: BatchGame) -> np.ndarray:
+        actions = random_policy(rng, illegal=0.002)(game)
+        chosen.append(actions)
+        return actions
+
+    batch.play(recording_policy, max_steps)
+    moves = np.stack(chosen, axis=1) if chosen else np.zeros((n, 0, 2), dtype=int)
+    mismatches = 0
+    for i in range(n):
+        replay = iter(tuple(int(a) for a in move) for move in moves[i])
+        game = Game(lambda loc, t: next(replay), track, float("inf"), 0)
+        status, msg = Status.ONGOING, "Just Started."
+        for _ in range(max_steps):
+            if status != Status.ONGOING:
+                break
+            status, msg = game.tick()
+        if (status, msg, len(game.history), game.pos) != (
+            *batch.result(i),
+            int(batch.steps[i]),
+            tuple(int(p) for p in batch.pos[i]),
+        ):
+            mismatches += 1
+    return mismatches
+
+
+def check_tracks() -> dict[str, RaceTrack]:
+    """The tracks --check runs on by default, by name."""
+    tracks = {f: load_track(f) for f in sorted(glob.glob(CHECK_TRACKS))}
+    for seed in CHECK_SEEDS:
+        tracks[f"generated (seed {seed})"] = generate_track(CHECK_SHAPE, seed=seed)[0]
+    return tracks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run random rollouts with the batch engine.")
+    parser.add_argument("--track", default=None, help=f"defaults to {TRACK}")
+    parser.add_argument("-n", type=int, default=10_000, help="number of racers")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="compare against Game instead (on --track, or a set of bundled and generated tracks), "
+        "exiting with status 1 if any racer differs",
+    )
+    args = parser.parse_args()
+    if args.check:
+        tracks = check_tracks() if args.track is None else {args.track: load_track(args.track)}
+        differ = 0
+        for name, track in tracks.items():
+            mismatches = check_against_game(track, seed=args.seed)
+            print(f"{mismatches} racers differ from Game on {name}")
+            differ += mismatches
+        if differ:
+            sys.exit(1)
+        return
+    track = load_track(TRACK if args.track is None else args.track)
+    game = BatchGame(track, args.n)
+    start = perf_counter()
+    game.play(random_policy(np.random.default_rng(args.seed)))
+    seconds = perf_counter() - start
+    finished = int((game.status == Status.FINISH.value).sum())
+    print(
+        f"{args.n} random rollouts in {seconds:.3f}s ({args.n / seconds:,.0f}/s), "
+        f"{finished} finished, longest {game.steps.max()} steps"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+import argparse
+from copy import deepcopy
+import glob
+import json
+import platform
+import random
+from statistics import median
+import sys
+from time import perf_counter
+from typing import Callable
+
+import numpy as np
+
+from game import Game, Player
+from game_world.hierarchy import HierarchicalPathfinder
+from game_world.jump_point import JumpPointSearch
+from game_world.racetrack import RaceTrack, blank_track, load_track
+import random_bot
+import serena_bot
+
+TRACKS = "tracks/*.pkl"
+SIZES = [25, 50, 100, 200]
+REPEATS = 5
+THRESHOLD = 0.25  # flag anything this much slower than the baseline (0.25 = 25%)
+
+
+def timed(fn: Callable[[], object], repeats: int = REPEATS) -> float:
+    """Median wall time of fn over a few runs, in seconds."""
+    times = []
+    for _ in range(repeats):
+        start = perf_counter()
+        fn()
+        times.append(perf_counter() - start)
+    return median(times)
+
+
+def synthetic_track(size: int, density: float = 0.2, seed: int = 0) -> RaceTrack:
+    """
+    A size x size track of scattered black walls with two colored gates and a button for each.
+    Spawn is the top left corner and the target the bottom right, as in blank_track.
+    """
+    rng = np.random.default_rng(seed)
+    track = blank_track((size, size), (600, 600), 7)
+    track.walls[:] = rng.random((size, size)) < density
+    track.wall_colors[:] = track.walls
+    for color, row in ((2, size // 3), (4, 2 * size // 3)):
+        track.walls[row, :] = True
+        track.wall_colors[row, :] = color
+        track.buttons[row - 1, size // 2] = True
+        track.button_colors[row - 1, size // 2] = color
+    track.walls[track.buttons] = False
+    track.walls[track.spawn] = track.walls[track.target] = False
+    track.refresh()
+    return track
+
+
+def stand_still(loc, track):
+    return (0, 0)
+
+
+def bench_tick(track: RaceTrack) -> float:
+    """Engine time per tick, with a player that costs nothing."""
+    ticks = 100
+    game = Game(stand_still, track, float("inf"), 0, max_turns_without_progress=10**9)
+
+    def run():
+        for _ in range(ticks):
+            game.tick()
+
+    return timed(run) / ticks
+
+
+def bench_queries(track: RaceTrack) -> dict[str, float]:
+    colors = sorted({int(c) for c in np.unique(track.wall_colors[track.walls])}) or [1]
+    warm = deepcopy(track)
+    warm.find_traversable_cells()
+
+    def toggle_all():
+        for color in colors:
+            warm.toggle(color)
+
+    return {
+        "find_traversable_cells_cold": timed(
+            lambda: track.snapshot().find_traversable_cells()
+        ),
+        "find_traversable_cells": timed(warm.find_traversable_cells),
+        "toggle": timed(toggle_all) / len(colors),
+        "find_buttons": timed(warm.find_buttons),
+        "is_traversable": timed(lambda: warm.is_traversable(*track.target)),
+    }
+
+
+def far_cell(track: RaceTrack) -> tuple[int, int]:
+    """The reachable cell furthest from spawn in the track's current state."""
+    dist = track.distance_field(track.spawn)
+    return tuple(int(i) for i in np.unravel_index(np.argmax(dist), dist.shape))
+
+
+def bench_paths(track: RaceTrack) -> dict[str, float]:
+    """One long path query, from spawn to the furthest cell it can reach."""
+    goal = far_cell(track)
+    warm = HierarchicalPathfinder(track)
+    warm.find_path(track.spawn, goal)
+    return {
+        "astar": timed(lambda: serena_bot.astar(track.spawn, goal, track)),
+        "hpa_cold": timed(
+            lambda: HierarchicalPathfinder(track).find_path(track.spawn, goal)
+        ),
+        "hpa": timed(lambda: warm.find_path(track.spawn, goal)),
+        "jps": timed(lambda: JumpPointSearch(track).find_path(track.spawn, goal)),
+    }
+
+
+def count_expansions(track: RaceTrack) -> dict[str, int]:
+    """How many nodes each path search expands on bench_paths' query."""
+    goal = far_cell(track)
+    stats = {}
+    serena_bot.astar(track.spawn, goal, track, stats)
+    hpa = HierarchicalPathfinder(track)
+    hpa.find_path(track.spawn, goal)
+    jps = JumpPointSearch(track)
+    jps.find_path(track.spawn, goal)
+    return {"astar": stats["expanded"], "hpa": hpa.expanded, "jps": jps.expanded}
+
+
+def bench_bot(player: Player, track: RaceTrack) -> dict[str, float]:
+    """A whole game from a cold start, and the same time spread over its steps."""
+    steps = []
+
+    def run():
+        random.seed(0)
+        serena_bot.plan_cache.clear()
+        game = Game(player, track, float("inf"), 0)
+        game.play_game()
+        steps.append(len(game.history))
+
+    seconds = timed(run, 3)
+    return {"seconds": seconds, "per_step": seconds / max(steps[-1], 1)}
+
+
+def load_tracks(track_files: list[str], sizes: list[int]) -> dict[str, RaceTrack]:
+    tracks = {f: load_track(f) for f in track_files}
+    return tracks | {f"synthetic_{size}": synthetic_track(size) for size in sizes}
+
+
+def run_benchmarks(track_files: list[str], sizes: list[int]) -> dict[str, float]:
+    """Run everything and return a flat {benchmark name: seconds} mapping."""
+    tracks = load_tracks(track_files, sizes)
+    results = {}
+    for name, track in tracks.items():
+        results[f"tick/{name}"] = bench_tick(track)
+        for query, seconds in bench_queries(track).items():
+            results[f"query/{query}/{name}"] = seconds
+        for query, seconds in bench_paths(track).items():
+            results[f"path/{query}/{name}"] = seconds
+        for bot, player in (("random_bot", random_bot.random_move), ("serena_bot", serena_bot.act)):
+            for metric, seconds in bench_bot(player, track).items():
+                results[f"bot/{bot}/{metric}/{name}"] = seconds
+    return results
+
+
+def compare(
+    results: dict[str, float], baseline: dict[str, float], threshold: float
+) -> list[str]:
+    """Describe every benchmark that got more than threshold slower than the baseline."""
+    slower = []
+    for name, seconds in results.items():
+        before = baseline.get(name)
+        if before and seconds > before * (1 + threshold):
+            slower.append(f"{name}: {before:.3g}s -> {seconds:.3g}s ({seconds / before - 1:+.0%})")
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the engine, track queries and bots.")
+    parser.add_argument("--tracks", nargs="+", default=sorted(glob.glob(TRACKS)))
+    parser.add_argument("--sizes", nargs="*", type=int, default=SIZES)
+    parser.add_argument("--out", default="bench_output.json", help="where to write results")
+    parser.add_argument("--baseline", help="earlier results to compare against")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.tracks, args.sizes)
+    expansions = {
+        name: count_expansions(track)
+        for name, track in load_tracks(args.tracks, args.sizes).items()
+    }
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+        },
+        "results": results,
+        "expansions": expansions,
+    }
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {len(results)} results to {args.out}")
+    for name, counts in expansions.items():
+        seconds = {query: results[f"path/{query}/{name}"] for query in ("astar", "jps")}
+        print(
+            f"{name}: astar expands {counts['astar']} in {seconds['astar'] * 1000:.2f}ms, "
+            f"jps {counts['jps']} in {seconds['jps'] * 1000:.2f}ms"
+        )
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        slower = compare(results, baseline, args.threshold)
+        for line in slower:
+            print(f"SLOWER {line}")
+        if slower:
+            sys.exit(1)
+        print(f"No benchmark more than {args.threshold:.0%} slower than {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
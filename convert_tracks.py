@@ -0,0 +1,29 @@
+import argparse
+import glob
+import os
+
+from game_world.racetrack import load_track
+
+TRACKS = "tracks/*.pkl"
+EXTENSION = ".track"
+
+
+def convert(filename: str) -> str:
+    """Save a pickled track as a versioned track file next to it, and return the new name."""
+    out = os.path.splitext(filename)[0] + EXTENSION
+    load_track(filename).save(out)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Convert pickled tracks to the versioned, memory-mappable track format."
+    )
+    parser.add_argument("tracks", nargs="*", default=sorted(glob.glob(TRACKS)))
+    args = parser.parse_args()
+    for filename in args.tracks:
+        print(f"{filename} -> {convert(filename)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,9 @@
-from copy import deepcopy
 from enum import Enum
 import sys
 from time import monotonic
-from typing import Callable
+from typing import Callable, Iterable
 
-import pygame
-import pygame.locals
+import numpy as np
 
 from game_world.racetrack import RaceTrack, load_track
 from random_bot import random_move
@@ -19,6 +17,7 @@ SHOW_REPLAY = True
 
 
 Point = tuple[int, int]
+MOVES = frozenset({(1, 0), (-1, 0), (0, 1), (0, -1), (0, 0)})
 Player = Callable[
     [Point, RaceTrack], Point
 ]  # (location, velocity, track) -> change_in_velocity
@@ -34,6 +33,82 @@ def manhattan_dist(a: Point, b: Point) -> int:
     return abs(a[0] - b[0]) + abs(a[1] - b[1])
 
 
+class TickStats:
+    """
+    Per-tick timings recorded by a Game created with instrument=True.
+    All times are in seconds; budget is the racer's time left after each tick.
+    """
+
+    FIELDS = ("player", "copy", "check", "toggle", "budget")
+
+    def __init__(self) -> None:
+        self.player: list[float] = []
+        self.copy: list[float] = []
+        self.check: list[float] = []
+        self.toggle: list[float] = []
+        self.budget: list[float] = []
+
+    def record(
+        self, player: float, copy: float, check: float, toggle: float, budget: float
+    ) -> None:
+        self.player.append(player)
+        self.copy.append(copy)
+        self.check.append(check)
+        self.toggle.append(toggle)
+        self.budget.append(budget)
+
+    def summary(
+        self, percentiles: tuple[float, ...] = (50, 90, 99)
+    ) -> dict[str, dict[str, float]]:
+        """
+        Summarize every field.
+
+        Args:
+            percentiles (tuple[float, ...], optional): Which percentiles to report. Defaults to (50, 90, 99).
+
+        Returns:
+            dict[str, dict[str, float]]: For each field, its mean, min, max, total and percentiles (as "p50" etc).
+        """
+        output = {}
+        for field in self.FIELDS:
+            values = np.asarray(getattr(self, field), dtype=float)
+            if not values.size:
+                continue
+            output[field] = {
+                "mean": float(values.mean()),
+                "min": float(values.min()),
+                "max": float(values.max()),
+                "total": float(values.sum()),
+            } | {
+                f"p{p:g}": float(v)
+                for p, v in zip(percentiles, np.percentile(values, percentiles))
+            }
+        return output
+
+    def histogram(
+        self, field: str = "player", bins: int = 10
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Bucket one field's values, as numpy.histogram does.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: The count in each bucket and the bucket edges.
+        """
+        return np.histogram(np.asarray(getattr(self, field), dtype=float), bins=bins)
+
+    def report(self) -> str:
+        """A few readable lines on where the time went."""
+        lines = [f"{len(self.player)} ticks"]
+        for field, values in self.summary().items():
+            if field == "budget":
+                values.pop("total")
+            lines.append(
+                f"{field:>7}: "
+                + "  ".join(f"{name} {value * 1000:.3f}ms" for name, value in values.items())
+            )
+        return "\n".join(lines)
+
+
 class Game:
 
     def __init__(
@@ -43,9 +118,12 @@ class Game:
         time: float,
         delay: float,
         max_turns_without_progress: int = 100,
+        instrument: bool = False,
     ) -> None:
         self.player = player
-        self.track = deepcopy(track)
+        self.track = track.snapshot()
+        # worked out once here, so every snapshot handed to the racer shares it
+        self.track.fingerprint()
         self.time = time
         self.delay = delay
         self.turns_without_progress = 0
@@ -53,9 +131,15 @@ class Game:
         self.pos = track.spawn
         self.min_dist = float("inf")
         self.history = []
+        self.stats = TickStats() if instrument else None
+        self._toggle_time = 0.0
 
     def tick(self) -> tuple[Status, str]:
-        track_copy = deepcopy(self.track)
+        stats = self.stats
+        if stats is not None:
+            copy_start = monotonic()
+        track_copy = self.track.snapshot()
+        track_copy.time_left = self.time
         start_time = monotonic()
         try:
             action = self.player(self.pos, track_copy)
@@ -68,20 +152,37 @@ class Game:
         self.time -= time_taken
         self.history.append(action)
         if self.time < 0:
+            if stats is not None:
+                stats.record(time_taken, start_time - copy_start, 0.0, 0.0, self.time)
             return Status.DNF, "Timed Out"
         self.time += min(time_taken, self.delay)
-        options = {(1, 0), (-1, 0), (0, 1), (0, -1), (0, 0)}
-        if action not in options:
+        if stats is None:
+            return self._move(action)
+        self._toggle_time = 0.0
+        check_start = monotonic()
+        result = self._move(action)
+        stats.record(
+            time_taken,
+            start_time - copy_start,
+            monotonic() - check_start - self._toggle_time,
+            self._toggle_time,
+            self.time,
+        )
+        return result
+
+    def _move(self, action: Point) -> tuple[Status, str]:
+        """Check and carry out the racer's move."""
+        if action not in MOVES:
             return Status.DNF, f"Racer made illegal move {action}!"
         if self.track.buttons[self.pos]:
+            toggle_start = monotonic()
             self.track.toggle(self.track.button_colors[self.pos])
+            self._toggle_time = monotonic() - toggle_start
         self.pos = (self.pos[0] + action[0], self.pos[1] + action[1])
-        if not (
-            self.pos[0] in range(self.track.shape[0])
-            and self.pos[1] in range(self.track.shape[1])
-        ):
+        rows, cols = self.track.shape
+        if not (0 <= self.pos[0] < rows and 0 <= self.pos[1] < cols):
             return Status.DNF, "Racer went out of bounds!"
-        if not self.pos in self.track.find_traversable_cells():
+        if not self.track.is_traversable(*self.pos):
             return Status.DNF, "Racer crashed into a wall!"
         new_dist = manhattan_dist(self.pos, self.track.target)
         if new_dist < self.min_dist:
@@ -108,11 +209,12 @@ class Game:
         return status, msg
 
 
-def replay_player_generator(history: list[Point]) -> Player:
+def replay_player_generator(history: Iterable[Point]) -> Player:
+    # history is only read, one move per tick; once it runs out the racer stands still
+    moves = iter(history)
+
     def replay(loc: Point, track: RaceTrack) -> Point:
-        if history:
-            return history.pop(0)
-        return (0, 0)
+        return next(moves, (0, 0))
 
     return replay
 
@@ -121,7 +223,10 @@ def interpolate(start: Point, end: Point, p: float) -> tuple[float, float]:
     return (start[0] * (1 - p) + end[0] * p, start[1] * (1 - p) + end[1] * p)
 
 
-def watch_replay(track: RaceTrack, history: list[Point], time_per_move: float):
+def watch_replay(track: RaceTrack, history: Iterable[Point], time_per_move: float):
+    import pygame
+    import pygame.locals
+
     cell_w = track.screen_size[0] / track.shape[1]
     cell_h = track.screen_size[1] / track.shape[0]
 
@@ -141,7 +246,6 @@ def watch_replay(track: RaceTrack, history: list[Point], time_per_move: float):
     while True:
 
         p = min(p + dt / time_per_move, 1)
-        track_surface = game.track.render()
         if p >= 1:
             if done:
                 break
@@ -149,6 +253,7 @@ def watch_replay(track: RaceTrack, history: list[Point], time_per_move: float):
             if status != Status.ONGOING:
                 done = True
             move_start, move_end = move_end, game.pos
+            track_surface = game.track.render()
             p = 0
         player_location = interpolate(move_start, move_end, p)
         x, y = (player_location[1] + 0.5) * cell_w, (player_location[0] + 0.5) * cell_h
@@ -0,0 +1,238 @@
+import heapq
+from collections import deque
+
+import numpy as np
+
+from game_world.racetrack import RaceTrack
+
+Point = tuple[int, int]
+CLUSTER_SIZE = 16
+LONG_ENTRANCE = 6  # open stretches of border at least this long get an entrance at each end
+WEIGHT = 1.1  # heuristic weight for the abstract search; paths may be up to ~10% longer
+NEIGHBORS: list[Point] = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+
+
+class HierarchicalPathfinder:
+    """
+    Near-shortest paths over big tracks via HPA*: the track is cut into square clusters,
+    and paths are found between the entrances on cluster borders before being filled in
+    cell by cell.
+
+    Everything is worked out lazily and cached per cluster, keyed by the toggle state of
+    just the colors whose walls are inside that cluster (its mask). Toggling a color
+    therefore only changes the key, and so drops the cached work, of the clusters holding
+    that color's walls; everywhere else the next query reuses what's there. Like astar,
+    paths go through the track as it is in one toggle state, without pressing buttons.
+
+    The search between entrances weights its heuristic (weight), which on open tracks
+    cuts the nodes expanded by an order of magnitude; a weight of 1 gives the shortest
+    path through the entrances, which is itself slightly longer than the true shortest.
+    """
+
+    def __init__(
+        self, track: RaceTrack, cluster_size: int = CLUSTER_SIZE, weight: float = WEIGHT
+    ) -> None:
+        self.track = track.snapshot()
+        self.weight = weight
+        self.base_state = self.track.state
+        self.size = cluster_size
+        rows, cols = self.track.shape
+        self.clusters = (-(-rows // cluster_size), -(-cols // cluster_size))
+        self.masks = np.zeros(self.clusters, dtype=np.int64)
+        padded = np.zeros(
+            (self.clusters[0] * cluster_size, self.clusters[1] * cluster_size), dtype=bool
+        )
+        for color in np.unique(self.track.wall_colors[self.track.walls]):
+            padded[:rows, :cols] = self.track.walls & (self.track.wall_colors == color)
+            present = padded.reshape(
+                self.clusters[0], cluster_size, self.clusters[1], cluster_size
+            ).any(axis=(1, 3))
+            self.masks[present] |= 1 << int(color)
+        self._open: dict[tuple[Point, int], list[list[bool]]] = {}
+        self._dist: dict[tuple[Point, int, Point], dict[Point, int]] = {}
+        self._entrances: dict[tuple[Point, Point, int, int], list[tuple[Point, Point]]] = {}
+        self.expanded = 0  # abstract nodes expanded by the last find_path
+
+    def cluster_of(self, cell: Point) -> Point:
+        return cell[0] // self.size, cell[1] // self.size
+
+    def key(self, cluster: Point, state: int) -> int:
+        """The part of a toggle state that matters inside a cluster."""
+        return state & int(self.masks[cluster])
+
+    def _bounds(self, cluster: Point) -> tuple[int, int, int, int]:
+        top, left = cluster[0] * self.size, cluster[1] * self.size
+        rows, cols = self.track.shape
+        return top, left, min(top + self.size, rows), min(left + self.size, cols)
+
+    def open_cells(self, cluster: Point, state: int) -> list[list[bool]]:
+        """Which cells of a cluster can be stood on, as nested lists indexed from its corner."""
+        key = (cluster, self.key(cluster, state))
+        if key not in self._open:
+            top, left, bottom, right = self._bounds(cluster)
+            area = (slice(top, bottom), slice(left, right))
+            walls = self.track.walls[area]
+            active = self.track.active[area].copy()
+            changed = (state ^ self.base_state) & int(self.masks[cluster])
+            if changed:
+                bits = np.left_shift(1, self.track.wall_colors[area].astype(np.int64))
+                active ^= walls & (bits & changed != 0)
+            self._open[key] = (~walls | ~active).tolist()
+        return self._open[key]
+
+    def distances(self, cluster: Point, state: int, source: Point) -> dict[Point, int]:
+        """Moves from source to every cell it can reach without leaving its cluster."""
+        key = (cluster, self.key(cluster, state), source)
+        if key not in self._dist:
+            top, left, bottom, right = self._bounds(cluster)
+            open_cells = self.open_cells(cluster, state)
+            dist = {source: 0}
+            queue = deque([source])
+            while queue:
+                cell = queue.popleft()
+                for dr, dc in NEIGHBORS:
+                    r, c = cell[0] + dr, cell[1] + dc
+                    if (
+                        top <= r < bottom
+                        and left <= c < right
+                        and (r, c) not in dist
+                        and open_cells[r - top][c - left]
+                    ):
+                        dist[(r, c)] = dist[cell] + 1
+                        queue.append((r, c))
+            self._dist[key] = dist
+        return self._dist[key]
+
+    def entrances(self, a: Point, b: Point, state: int) -> list[tuple[Point, Point]]:
+        """
+        The crossings between cluster a and the cluster b to its right or below it,
+        as (cell in a, cell in b) pairs.
+        """
+        key = (a, b, self.key(a, state), self.key(b, state))
+        if key not in self._entrances:
+            top, left, bottom, right = self._bounds(a)
+            open_a, open_b = self.open_cells(a, state), self.open_cells(b, state)
+            if b[1] > a[1]:
+                pairs = [
+                    ((r, right - 1), (r, right))
+                    for r in range(top, bottom)
+                    if open_a[r - top][-1] and open_b[r - top][0]
+                ]
+                along = 0
+            else:
+                pairs = [
+                    ((bottom - 1, c), (bottom, c))
+                    for c in range(left, right)
+                    if open_a[-1][c - left] and open_b[0][c - left]
+                ]
+                along = 1
+            chosen = []
+            run: list[tuple[Point, Point]] = []
+            for pair in pairs + [None]:
+                if run and (pair is None or pair[0][along] != run[-1][0][along] + 1):
+                    if len(run) >= LONG_ENTRANCE:
+                        chosen += [run[0], run[-1]]
+                    else:
+                        chosen.append(run[len(run) // 2])
+                    run = []
+                if pair is not None:
+                    run.append(pair)
+            self._entrances[key] = chosen
+        return self._entrances[key]
+
+    def _crossings(self, cluster: Point, state: int) -> dict[Point, list[Point]]:
+        """Each entrance cell in a cluster and the cells across the border from it."""
+        crossings: dict[Point, list[Point]] = {}
+        i, j = cluster
+        for other in ((i - 1, j), (i + 1, j), (i, j - 1), (i, j + 1)):
+            if not (0 <= other[0] < self.clusters[0] and 0 <= other[1] < self.clusters[1]):
+                continue
+            if other < cluster:
+                pairs = [(b, a) for a, b in self.entrances(other, cluster, state)]
+            else:
+                pairs = self.entrances(cluster, other, state)
+            for inside, outside in pairs:
+                crossings.setdefault(inside, []).append(outside)
+        return crossings
+
+    def find_path(self, start: Point, goal: Point, state: int | None = None) -> list[Point] | None:
+        """
+        Find a path between two cells through the track in one toggle state.
+
+        Args:
+            start (Point): The (row, col) to start from.
+            goal (Point): The (row, col) to get to.
+            state (int | None, optional): The toggle bitmask to walk through. Defaults to the
+                state of the track the pathfinder was built from.
+
+        Returns:
+            list[Point] | None: Every cell along the way, start and goal included, or None if
+                the goal can't be reached. Paths can be a little longer than the shortest
+                (see weight).
+        """
+        state = self.base_state if state is None else state
+        start, goal = tuple(start), tuple(goal)
+        rows, cols = self.track.shape
+        for cell in (start, goal):
+            if not (0 <= cell[0] < rows and 0 <= cell[1] < cols):
+                return None
+        start_cluster, goal_cluster = self.cluster_of(start), self.cluster_of(goal)
+        for cell, cluster in ((start, start_cluster), (goal, goal_cluster)):
+            top, left, _, _ = self._bounds(cluster)
+            if not self.open_cells(cluster, state)[cell[0] - top][cell[1] - left]:
+                return None
+
+        def h(cell: Point) -> int:
+            return self.weight * (abs(cell[0] - goal[0]) + abs(cell[1] - goal[1]))
+
+        crossings: dict[Point, dict[Point, list[Point]]] = {}
+        g = {start: 0}
+        prev: dict[Point, Point | None] = {start: None}
+        # on equal estimates, try the node furthest along first; open tracks have many ties
+        frontier = [(h(start), 0, start)]
+        closed = set()
+        self.expanded = 0
+        while frontier:
+            *_, cell = heapq.heappop(frontier)
+            if cell in closed:
+                continue
+            if cell == goal:
+                return self._refine(goal, prev, state)
+            closed.add(cell)
+            self.expanded += 1
+            cluster = self.cluster_of(cell)
+            if cluster not in crossings:
+                crossings[cluster] = self._crossings(cluster, state)
+            reach = self.distances(cluster, state, cell)
+            edges = [(other, reach[other]) for other in crossings[cluster] if other in reach]
+            if cluster == goal_cluster and goal in reach:
+                edges.append((goal, reach[goal]))
+            edges += [(other, 1) for other in crossings[cluster].get(cell, [])]
+            for other, cost in edges:
+                if g[cell] + cost < g.get(other, float("inf")):
+                    g[other] = g[cell] + cost
+                    prev[other] = cell
+                    heapq.heappush(frontier, (g[other] + h(other), -g[other], other))
+        return None
+
+    def _refine(self, goal: Point, prev: dict[Point, Point | None], state: int) -> list[Point]:
+        """Fill in the cells between the abstract path's nodes."""
+        path = [goal]
+        cell = goal
+        while prev[cell] is not None:
+            before = prev[cell]
+            cluster = self.cluster_of(before)
+            if self.cluster_of(cell) == cluster:
+                # walk back down the distances from before
+                dist = self.distances(cluster, state, before)
+                while cell != before:
+                    cell = next(
+                        (cell[0] + dr, cell[1] + dc)
+                        for dr, dc in NEIGHBORS
+                        if dist.get((cell[0] + dr, cell[1] + dc)) == dist[cell] - 1
+                    )
+                    path.append(cell)
+            else:
+                path.append(before)
+            cell = before
+        return path[::-1]
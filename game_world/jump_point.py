@@ -0,0 +1,152 @@
+import heapq
+
+import numpy as np
+
+from game_world.racetrack import RaceTrack
+
+Point = tuple[int, int]
+
+
+class JumpPointSearch:
+    """
+    A* over jump points for a 4-connected, uniform cost grid.
+
+    Of all the equally short paths through open space, only the canonical one is
+    followed: it moves vertically whenever it can, and only turns from a horizontal run
+    onto a vertical one where a wall stopped it turning earlier (a forced neighbor).
+    Vertical scans therefore try a horizontal scan from every cell they pass, and a cell
+    only becomes a node in the search if one of those finds something. Long open runs
+    cost a scan, not a heap entry per cell, which is where plain A* spends its time.
+    """
+
+    def __init__(self, track: RaceTrack, state: int | None = None) -> None:
+        # a ring of closed cells saves every scan a bounds check
+        self.open = np.pad(track.traversable_mask(state), 1).tolist()
+        self.expanded = 0  # nodes expanded by the last find_path
+
+    def _scan_horizontal(self, row: int, col: int, dc: int, goal: Point) -> Point | None:
+        open_cells = self.open
+        above, here, below = open_cells[row - 1], open_cells[row], open_cells[row + 1]
+        while True:
+            col += dc
+            if not here[col]:
+                return None
+            if (row, col) == goal:
+                return row, col
+            if (above[col] and not above[col - dc]) or (below[col] and not below[col - dc]):
+                return row, col
+
+    def _scan_vertical(self, row: int, col: int, dr: int, goal: Point) -> Point | None:
+        open_cells = self.open
+        while True:
+            row += dr
+            if not open_cells[row][col]:
+                return None
+            if (row, col) == goal:
+                return row, col
+            if (
+                self._scan_horizontal(row, col, 1, goal) is not None
+                or self._scan_horizontal(row, col, -1, goal) is not None
+            ):
+                return row, col
+
+    def _directions(self, cell: Point, parent: Point | None) -> list[Point]:
+        """The directions worth scanning from a jump point, given where it was reached from."""
+        if parent is None:
+            return [(-1, 0), (1, 0), (0, -1), (0, 1)]
+        row, col = cell
+        if parent[1] == col:
+            dr = 1 if row > parent[0] else -1
+            return [(dr, 0), (0, -1), (0, 1)]
+        dc = 1 if col > parent[1] else -1
+        directions = [(0, dc)]
+        for dr in (-1, 1):
+            if self.open[row + dr][col] and not self.open[row + dr][col - dc]:
+                directions.append((dr, 0))
+        return directions
+
+    def find_path(self, start: Point, goal: Point) -> list[Point] | None:
+        """
+        Find a shortest path between two cells.
+
+        Args:
+            start (Point): The (row, col) to start from.
+            goal (Point): The (row, col) to get to.
+
+        Returns:
+            list[Point] | None: Every cell along the way, start and goal included (like
+                serena_bot.astar), or None if the goal can't be reached.
+        """
+        # work in padded coordinates, one row and column in from the track's
+        start, goal = (start[0] + 1, start[1] + 1), (goal[0] + 1, goal[1] + 1)
+        self.expanded = 0
+        if not self._inside(start) or not self._inside(goal):
+            return None
+
+        def h(cell: Point) -> int:
+            return abs(cell[0] - goal[0]) + abs(cell[1] - goal[1])
+
+        g = {start: 0}
+        prev: dict[Point, Point | None] = {start: None}
+        frontier = [(h(start), 0, start)]
+        closed = set()
+        while frontier:
+            *_, cell = heapq.heappop(frontier)
+            if cell in closed:
+                continue
+            if cell == goal:
+                return self._unpack(goal, prev)
+            closed.add(cell)
+            self.expanded += 1
+            for dr, dc in self._directions(cell, prev[cell]):
+                if dc:
+                    jump = self._scan_horizontal(cell[0], cell[1], dc, goal)
+                else:
+                    jump = self._scan_vertical(cell[0], cell[1], dr, goal)
+                if jump is None:
+                    continue
+                cost = g[cell] + abs(jump[0] - cell[0]) + abs(jump[1] - cell[1])
+                if cost < g.get(jump, float("inf")):
+                    g[jump] = cost
+                    prev[jump] = cell
+                    heapq.heappush(frontier, (cost + h(jump), -cost, jump))
+        return None
+
+    def _inside(self, cell: Point) -> bool:
+        return (
+            0 < cell[0] < len(self.open) - 1
+            and 0 < cell[1] < len(self.open[0]) - 1
+            and self.open[cell[0]][cell[1]]
+        )
+
+    def _unpack(self, goal: Point, prev: dict[Point, Point | None]) -> list[Point]:
+        """Turn the chain of jump points into every cell along it, in track coordinates."""
+        path = [(goal[0] - 1, goal[1] - 1)]
+        cell = goal
+        while prev[cell] is not None:
+            before = prev[cell]
+            dr = (before[0] > cell[0]) - (before[0] < cell[0])
+            dc = (before[1] > cell[1]) - (before[1] < cell[1])
+            while cell != before:
+                cell = (cell[0] + dr, cell[1] + dc)
+                path.append((cell[0] - 1, cell[1] - 1))
+        return path[::-1]
+
+
+def jump_point_search(
+    start: Point, end: Point, track: RaceTrack, state: int | None = None
+) -> list[Point] | None:
+    """
+    Find a shortest path between two cells with jump point search, without pressing buttons.
+
+    Args:
+        start (Point): The (row, col) to start from.
+        end (Point): The (row, col) to get to.
+        track (RaceTrack): The track to search.
+        state (int | None, optional): The toggle bitmask to walk through. Defaults to the current state.
+
+    Returns:
+        list[Point] | None: Every cell along the way, start and end included, or None if
+            end can't be reached.
+    """
+    return JumpPointSearch(track, state).find_path(start, end)
@@ -0,0 +1,486 @@
+from copy import deepcopy
+import threading
+from time import monotonic, sleep
+
+import numpy as np
+
+from game_world.racetrack import LAYERS, RaceTrack
+
+Point = tuple[int, int]
+MOVES: list[Point] = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+STAY: Point = (0, 0)
+
+
+class ProductSpace:
+    """
+    The graph a racer actually moves through: every (cell, toggle state) pair.
+
+    Stepping off a button (or standing still on one) toggles its color before the
+    new cell is checked, exactly like Game.tick. Only colors that have both walls and
+    buttons can change the track, so each state is stored as a layer index whose bits
+    stand for those colors alone. Layer 0 is the state the space was built from.
+    Cells are stored flat on a grid padded with a ring of walls, so neighbor offsets
+    never need a bounds check.
+    """
+
+    def __init__(self, track: RaceTrack, state: int | None = None) -> None:
+        self.track = track
+        self.state = track.state if state is None else state
+        rows, cols = track.shape
+        self.width = cols + 2
+        self.layer_size = (rows + 2) * self.width
+        wall_colors = {int(c) for c in np.unique(track.wall_colors[track.walls])}
+        button_colors = {int(c) for c in np.unique(track.button_colors[track.buttons])}
+        self.colors = sorted(wall_colors & button_colors)
+        self.n_layers = 1 << len(self.colors)
+
+        self.flips = np.zeros(self.layer_size, dtype=np.intp)
+        for bit, color in enumerate(self.colors):
+            r, c = np.nonzero(track.buttons & (track.button_colors == color))
+            self.flips[self.pad_index(r, c)] = 1 << bit
+
+        self.open = np.zeros((self.n_layers, rows + 2, self.width), dtype=bool)
+        for layer in range(self.n_layers):
+            mask = track.traversable_mask(self.layer_state(layer))
+            self.open[layer, 1:-1, 1:-1] = mask
+        self.open = self.open.ravel()
+        self.steps = np.array([dr * self.width + dc for dr, dc in MOVES], dtype=np.intp)
+
+    def update(self, track: RaceTrack, rows: slice, cols: slice) -> bool:
+        """
+        Recompute a region of cells after the track's layers were edited there. The
+        colors that have both walls and buttons must still be the same (see colors);
+        otherwise build a new ProductSpace.
+
+        Returns:
+            bool: Whether any state in the region can be stood in now that couldn't
+                before, or any button changed - if not, the edit only took states away.
+        """
+        height, width = track.shape[0] + 2, self.width
+        padded = (slice(rows.start + 1, rows.stop + 1), slice(cols.start + 1, cols.stop + 1))
+        open_cells = self.open.reshape(self.n_layers, height, width)
+        flips = self.flips.reshape(height, width)
+        walls = track.walls[rows, cols]
+        active = track.active[rows, cols]
+        wall_bits = np.left_shift(1, track.wall_colors[rows, cols].astype(np.int64))
+        opened = False
+        for layer in range(self.n_layers):
+            toggled = walls & (wall_bits & (self.layer_state(layer) ^ track.state) != 0)
+            now_open = ~walls | ~(active ^ toggled)
+            opened |= bool((now_open & ~open_cells[layer][padded]).any())
+            open_cells[layer][padded] = now_open
+        new_flips = np.zeros(walls.shape, dtype=np.intp)
+        buttons = track.buttons[rows, cols]
+        for bit, color in enumerate(self.colors):
+            new_flips[buttons & (track.button_colors[rows, cols] == color)] = 1 << bit
+        opened |= bool((new_flips != flips[padded]).any())
+        flips[padded] = new_flips
+        return opened
+
+    def pad_index(self, row, col):
+        """Flat index of (row, col) within one padded layer."""
+        return (row + 1) * self.width + col + 1
+
+    def cell(self, index: int) -> Point:
+        """The (row, col) of a flat state index."""
+        row, col = divmod(int(index) % self.layer_size, self.width)
+        return row - 1, col - 1
+
+    def layer_state(self, layer: int) -> int:
+        """The track toggle bitmask that a layer index stands for."""
+        state = self.state
+        for bit, color in enumerate(self.colors):
+            if layer >> bit & 1:
+                state ^= 1 << color
+        return state
+
+    def state_index(self, pos: Point, state: int | None = None) -> int:
+        """
+        Flat index of the racer being at pos with the track in the given toggle state.
+        Bits for colors that can't change the track are ignored.
+        """
+        changed = (self.state if state is None else state) ^ self.state
+        layer = sum(1 << bit for bit, c in enumerate(self.colors) if changed >> c & 1)
+        return layer * self.layer_size + int(self.pad_index(pos[0], pos[1]))
+
+    def successors(self, frontier: np.ndarray) -> np.ndarray:
+        """Every state one move away from the states in frontier (may repeat)."""
+        cells = frontier % self.layer_size
+        flips = self.flips[cells]
+        # Leaving a button flips its color before the next cell is checked.
+        left = ((frontier // self.layer_size) ^ flips) * self.layer_size + cells
+        neighbors = (left[:, None] + self.steps).ravel()
+        return np.concatenate((neighbors, left[flips != 0]))
+
+    def predecessors(self, frontier: np.ndarray) -> np.ndarray:
+        """Every state one move before the states in frontier (may repeat, may be walls)."""
+        layers, cells = np.divmod(frontier, self.layer_size)
+        # Whoever came from a button flipped its color on the way out, so undo that.
+        before = (cells[:, None] - self.steps).ravel()
+        before_layers = np.repeat(layers, len(self.steps)) ^ self.flips[before]
+        stayed = cells[self.flips[cells] != 0]
+        stayed_layers = layers[self.flips[cells] != 0] ^ self.flips[stayed]
+        return np.concatenate(
+            (
+                before_layers * self.layer_size + before,
+                stayed_layers * self.layer_size + stayed,
+            )
+        )
+
+    def move_options(self, index: int) -> list[tuple[Point, int]]:
+        """The legal moves from a state and the state each leads to."""
+        layer, cell = divmod(index, self.layer_size)
+        flip = int(self.flips[cell])
+        left = (layer ^ flip) * self.layer_size + cell
+        options = [(move, left + int(step)) for move, step in zip(MOVES, self.steps)]
+        if flip:
+            options.append((STAY, left))
+        return [(move, after) for move, after in options if self.open[after]]
+
+    def search(self, start: int, goal: Point | None = None) -> tuple[np.ndarray, int | None]:
+        """
+        Breadth first search from a state index, one whole wave at a time.
+
+        Args:
+            start (int): The state index to search from.
+            goal (Point | None, optional): Stop as soon as this cell is reached in any state.
+                Defaults to None - if none, searches everything reachable.
+
+        Returns:
+            tuple[np.ndarray, int | None]: The distance to every state (-1 if unreached) and the
+                first goal state found, if any.
+        """
+        unvisited = self.open.copy()
+        dist = np.full(unvisited.size, -1, dtype=np.int32)
+        dist[start] = 0
+        unvisited[start] = False
+        goal_cell = None if goal is None else int(self.pad_index(*goal))
+        if goal_cell is not None and start % self.layer_size == goal_cell:
+            return dist, start
+        frontier = np.array([start], dtype=np.intp)
+        distance = 0
+        while frontier.size:
+            distance += 1
+            neighbors = self.successors(frontier)
+            frontier = np.unique(neighbors[unvisited[neighbors]])
+            unvisited[frontier] = False
+            dist[frontier] = distance
+            if goal_cell is not None:
+                found = frontier[frontier % self.layer_size == goal_cell]
+                if found.size:
+                    return dist, int(found[0])
+        return dist, None
+
+    def predecessor(self, dist: np.ndarray, index: int) -> int:
+        """A state one move closer to the search start than index."""
+        layer, cell = divmod(index, self.layer_size)
+        for before in (cell - self.steps).tolist() + [cell]:
+            flip = int(self.flips[before])
+            if before == cell and not flip:
+                continue
+            candidate = (layer ^ flip) * self.layer_size + before
+            if dist[candidate] == dist[index] - 1:
+                return candidate
+        raise ValueError(f"State {index} has no predecessor in this search.")
+
+    def moves_to(self, dist: np.ndarray, index: int) -> list[Point]:
+        """Retrace the moves from the search start to index."""
+        moves = []
+        while dist[index] > 0:
+            before = self.predecessor(dist, index)
+            (r0, c0), (r1, c1) = self.cell(before), self.cell(index)
+            moves.append((r1 - r0, c1 - c0))
+            index = before
+        return moves[::-1]
+
+
+def plan(
+    track: RaceTrack, start: Point | None = None, state: int | None = None
+) -> list[Point] | None:
+    """
+    Find a shortest sequence of moves to the target, pressing buttons as needed.
+
+    Args:
+        track (RaceTrack): The track to race on.
+        start (Point | None, optional): Where the racer is. Defaults to None - if none, the spawn.
+        state (int | None, optional): The toggle bitmask the track is in. Defaults to the current state.
+
+    Returns:
+        list[Point] | None: The moves to make, in order, or None if the target can't be reached.
+    """
+    space = ProductSpace(track, state)
+    start_index = space.state_index(track.spawn if start is None else start)
+    dist, goal = space.search(start_index, track.target)
+    if goal is None:
+        return None
+    return space.moves_to(dist, goal)
+
+
+class AnytimePlanner:
+    """
+    A search for the target that can stop at any deadline and pick up where it left off.
+
+    It searches backwards from the target, so what it learns is each state's distance
+    to the finish, which stays true however the racer moves. best_move() spends the
+    time it's given extending the search; once the racer's own state has been reached
+    the move it returns is optimal, and until then it's a best guess.
+    """
+
+    def __init__(self, track: RaceTrack, state: int | None = None) -> None:
+        self.space = ProductSpace(track, state)
+        space = self.space
+        goals = np.arange(space.n_layers) * space.layer_size + int(
+            space.pad_index(*track.target)
+        )
+        goals = goals[space.open[goals]]
+        self.unvisited = space.open.copy()
+        self.unvisited[goals] = False
+        self.dist = np.full(space.open.size, -1, dtype=np.int32)
+        self.dist[goals] = 0
+        self.frontier = goals
+        self.distance = 0
+        self.target = track.target
+
+    @property
+    def finished(self) -> bool:
+        """Whether the search has reached every state that can reach the target."""
+        return self.frontier.size == 0
+
+    def search(self, deadline: float, index: int | None = None) -> None:
+        """
+        Extend the search one wave at a time until the deadline (a time.monotonic() value),
+        the search is finished, or the given state index has been reached.
+        At least one wave is searched per call, so it always makes some progress.
+        """
+        while self.frontier.size:
+            if index is not None and self.dist[index] >= 0:
+                return
+            self.distance += 1
+            before = self.space.predecessors(self.frontier)
+            self.frontier = np.unique(before[self.unvisited[before]])
+            self.unvisited[self.frontier] = False
+            self.dist[self.frontier] = self.distance
+            if monotonic() >= deadline:
+                return
+
+    def best_move(self, pos: Point, state: int, deadline: float) -> Point:
+        """
+        Pick a move for a racer at pos with the track in the given toggle state.
+
+        Args:
+            pos (Point): Where the racer is.
+            state (int): The track's toggle bitmask (RaceTrack.state).
+            deadline (float): When to stop searching, as a time.monotonic() value.
+
+        Returns:
+            Point: An optimal move if the search got far enough, otherwise the legal move
+                that gets closest to the target by the search's or straight-line distance.
+        """
+        index = self.space.state_index(pos, state)
+        self.search(deadline, index)
+        return self.move_from(index)
+
+    def move_from(self, index: int) -> Point:
+        """The best move from a state index with what the search knows now, without searching."""
+        options = self.space.move_options(index)
+        if not options:
+            return STAY
+        known = [(int(self.dist[after]), move) for move, after in options if self.dist[after] >= 0]
+        if known:
+            return min(known)[1]
+
+        def straight_line(option: tuple[Point, int]) -> tuple[int, bool]:
+            move, after = option
+            row, col = self.space.cell(after)
+            distance = abs(row - self.target[0]) + abs(col - self.target[1])
+            return distance, move == STAY
+
+        return min(options, key=straight_line)[0]
+
+
+class BackgroundPlanner:
+    """
+    An AnytimePlanner that keeps searching on a worker thread between moves.
+
+    After each move the worker is told which state the racer should be in next, and
+    works out the move from there as soon as the search reaches it, so move() can
+    usually answer straight away. Only move() runs on the caller's thread, so only it
+    counts against a Game's time budget. The worker shares the GIL with everything
+    else, so it pauses once the search is finished, or once move() hasn't been called
+    for IDLE seconds (the game is probably over), and waits for the next move() until
+    stop() is called.
+    """
+
+    SLICE = 0.005  # seconds the worker searches before letting move() have the planner
+    IDLE = 1.0  # seconds without a move() call before the worker pauses
+
+    def __init__(self, track: RaceTrack, state: int | None = None) -> None:
+        self.planner = AnytimePlanner(track, state)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = False
+        self._predicted: int | None = None
+        self._ready: tuple[int, Point] | None = None
+        self._last_move = monotonic()
+        self._thread = threading.Thread(target=self._work, daemon=True)
+        self._thread.start()
+
+    def _work(self) -> None:
+        while not self._stopped:
+            if self.planner.finished or monotonic() - self._last_move > self.IDLE:
+                self._wake.wait()
+                self._wake.clear()
+            with self._lock:
+                self.planner.search(monotonic() + self.SLICE)
+                predicted, ready = self._predicted, self._ready
+                if (
+                    predicted is not None
+                    and (ready is None or ready[0] != predicted)
+                    and self.planner.dist[predicted] >= 0
+                ):
+                    self._ready = (predicted, self.planner.move_from(predicted))
+            sleep(0)  # give a waiting move() the chance to take the lock
+
+    def move(self, pos: Point, state: int, deadline: float) -> Point:
+        """
+        Pick a move for a racer at pos with the track in the given toggle state.
+
+        Args:
+            pos (Point): Where the racer is.
+            state (int): The track's toggle bitmask (RaceTrack.state).
+            deadline (float): When to stop searching if the answer isn't ready, as a
+                time.monotonic() value.
+
+        Returns:
+            Point: The move the worker prepared, or else AnytimePlanner.best_move()'s pick.
+        """
+        space = self.planner.space
+        index = space.state_index(pos, state)
+        ready = self._ready
+        if ready is not None and ready[0] == index:
+            move = ready[1]
+        else:
+            with self._lock:
+                move = self.planner.best_move(pos, state, deadline)
+        self._predicted = dict(space.move_options(index)).get(move)
+        self._last_move = monotonic()
+        self._wake.set()
+        return move
+
+    def stop(self) -> None:
+        """Stop the worker and wait for it to finish its current slice."""
+        self._stopped = True
+        self._wake.set()
+        self._thread.join()
+
+
+class LiveSolver:
+    """
+    Keeps a track's par up to date on a worker thread while the track is being edited.
+
+    The solver works on its own copy of the track. Each edit() hands it a copy of just
+    the region that changed, and the worker patches its product space there rather
+    than building it again. It only starts over when the set of colors with both walls
+    and buttons changes. Edits that only close off states the current solution doesn't
+    use keep that solution, since taking states away can't make a shorter one. Edits
+    that pile up while the worker is busy are all applied before it solves again.
+    """
+
+    def __init__(self, track: RaceTrack) -> None:
+        self.track = deepcopy(track)
+        self.space = ProductSpace(self.track)
+        region = (slice(None), slice(None))
+        self.wall_counts = _color_counts(self.track.walls, self.track.wall_colors, region)
+        self.button_counts = _color_counts(self.track.buttons, self.track.button_colors, region)
+        # (par, the cells a shortest solution passes through, where a racer can get):
+        # par is None and the reachable mask is filled in only when the target can't be reached
+        self.result: tuple[int | None, list[Point], np.ndarray | None] = (None, [], None)
+        self.solved = 0  # results published so far, so callers can tell when there's a new one
+        self._solution_states = np.zeros(0, dtype=np.intp)
+        self._edits: list[tuple[tuple[slice, slice], dict[str, np.ndarray], Point, Point]] = []
+        self._changed = threading.Condition()
+        self._solving = True
+        self._stopped = False
+        self._thread = threading.Thread(target=self._work, daemon=True)
+        self._thread.start()
+
+    @property
+    def busy(self) -> bool:
+        """Whether there are edits the published result doesn't include yet."""
+        return bool(self._edits) or self._solving
+
+    def edit(self, track: RaceTrack, region: tuple[slice, slice]) -> None:
+        """Tell the solver a region of the track (and maybe its spawn or target) changed."""
+        layers = {name: getattr(track, name)[region].copy() for name in LAYERS}
+        with self._changed:
+            self._edits.append((region, layers, track.spawn, track.target))
+            self._changed.notify()
+
+    def stop(self) -> None:
+        with self._changed:
+            self._stopped = True
+            self._changed.notify()
+        self._thread.join()
+
+    def _work(self) -> None:
+        self._solve(reuse=False)
+        while True:
+            with self._changed:
+                self._solving = False
+                while not self._edits and not self._stopped:
+                    self._changed.wait()
+                if self._stopped:
+                    return
+                edits, self._edits = self._edits, []
+                self._solving = True
+            self._solve(reuse=self._apply(edits))
+
+    def _apply(self, edits) -> bool:
+        """Apply edits to the solver's track and space, and say whether the old solution still holds."""
+        track = self.track
+        marks = (track.spawn, track.target)
+        for region, layers, spawn, target in edits:
+            self.wall_counts -= _color_counts(track.walls, track.wall_colors, region)
+            self.button_counts -= _color_counts(track.buttons, track.button_colors, region)
+            for name, values in layers.items():
+                getattr(track, name)[region] = values
+            self.wall_counts += _color_counts(track.walls, track.wall_colors, region)
+            self.button_counts += _color_counts(track.buttons, track.button_colors, region)
+            track.spawn, track.target = spawn, target
+        both = (self.wall_counts > 0) & (self.button_counts > 0)
+        if [int(c) for c in np.flatnonzero(both)] != self.space.colors:
+            track.refresh()
+            self.space = ProductSpace(track)
+            return False
+        opened = False
+        for (rows, cols), *_ in edits:
+            opened |= self.space.update(track, rows, cols)
+        return (
+            not opened
+            and marks == (track.spawn, track.target)
+            and self.result[0] is not None
+            and bool(self.space.open[self._solution_states].all())
+        )
+
+    def _solve(self, reuse: bool) -> None:
+        if not reuse:
+            space = self.space
+            dist, goal = space.search(space.state_index(self.track.spawn), self.track.target)
+            if goal is None:
+                self._solution_states = np.zeros(0, dtype=np.intp)
+                reached = (dist >= 0).reshape(space.n_layers, -1).any(axis=0)
+                reachable = reached.reshape(-1, space.width)[1:-1, 1:-1]
+                self.result = (None, [], reachable)
+            else:
+                states = [goal]
+                while dist[states[-1]] > 0:
+                    states.append(space.predecessor(dist, states[-1]))
+                states.reverse()
+                self._solution_states = np.array(states, dtype=np.intp)
+                self.result = (len(states) - 1, [space.cell(index) for index in states], None)
+        self.solved += 1
+
+
+def _color_counts(present: np.ndarray, colors: np.ndarray, region: tuple[slice, slice]) -> np.ndarray:
+    """How many of the cells in region where present is set have each color."""
+    return np.bincount(colors[region][present[region]], minlength=256)
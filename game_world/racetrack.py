@@ -1,10 +1,87 @@
-from copy import deepcopy
-from itertools import product
+from collections.abc import Iterable
+from copy import copy, deepcopy
+import hashlib
+import json
+import os
 import pickle
-import pygame
+import struct
+from typing import TYPE_CHECKING, BinaryIO
+
 import numpy as np
 
+if TYPE_CHECKING:
+    import pygame
+
 Point = tuple[int, int]
+# Track files: magic, then version and header length as little endian uint32s, then a
+# JSON header, then each layer's raw C-order bytes at the offset the header gives.
+TRACK_FILE_MAGIC = b"RACETRK\x00"
+TRACK_FILE_VERSION = 1
+LAYERS = ("walls", "active", "buttons", "wall_colors", "button_colors")
+_LAYER_ALIGNMENT = 64
+
+
+def _frozen(array: np.ndarray) -> np.ndarray:
+    """
+    A read-only array with the same contents that can't be made writeable again.
+    Setting the writeable flag back is allowed on any array that owns its memory, and a
+    view's .base leads straight to that array, so read-only views alone don't protect
+    it. Arrays over immutable memory (bytes, or a file mapped read-only) are returned
+    as they are; anything else is copied into bytes.
+    """
+    root = array
+    while isinstance(root, np.ndarray) and root.base is not None:
+        root = root.base
+    try:
+        immutable = not isinstance(root, np.ndarray) and memoryview(root).readonly
+    except TypeError:
+        immutable = False
+    if immutable:
+        return array
+    return np.frombuffer(array.tobytes(), dtype=array.dtype).reshape(array.shape)
+
+
+_EMPTY_INDEX = _frozen(np.zeros(0, dtype=np.intp))
+
+
+def _index_by_color(index: np.ndarray, colors: np.ndarray) -> dict[int, np.ndarray]:
+    """Group flat cell indices by the color each cell has in `colors`."""
+    cell_colors = colors.flat[index].astype(int)
+    order = np.argsort(cell_colors, kind="stable")
+    keys, starts = np.unique(cell_colors[order], return_index=True)
+    sorted_index = _frozen(index[order])
+    groups = np.split(sorted_index, starts[1:])
+    return {int(k): group for k, group in zip(keys, groups)}
+
+
+# pygame is only imported once something is drawn, so headless code never pays for it.
+COLOR_SCHEME = {
+    0: "#ffffff",
+    1: "#000000",
+    2: "#d20000",
+    3: "#de9f00",
+    4: "#00AE00",
+    5: "#0000cd",
+    6: "#8b008b",
+    7: "#739F9F",
+}
+_sprite_cache: dict[tuple[float, float], tuple["pygame.Surface", "pygame.Surface"]] = {}
+
+
+def _sprites(w: float, h: float) -> tuple["pygame.Surface", "pygame.Surface"]:
+    """The target star and spawn triangle, scaled for cells of size w x h."""
+    import pygame
+
+    if (w, h) not in _sprite_cache:
+        star_img = pygame.image.load("star.png")
+        star_img = pygame.transform.scale(star_img, (0.8 * w, 0.8 * h))
+        triangle = pygame.Surface((0.8 * w, 0.8 * w), pygame.SRCALPHA, 32)
+        triangle = triangle.convert_alpha()
+        pygame.draw.polygon(
+            triangle, "#278B00", [(0.4 * w, 0), (0.8 * w, 0.8 * h), (0, 0.8 * h)]
+        )
+        _sprite_cache[w, h] = star_img, triangle
+    return _sprite_cache[w, h]
 
 
 class RaceTrack:
@@ -28,29 +105,151 @@ class RaceTrack:
             == button_colors.shape
         ):
             raise ValueError("All map layers must be same shape.")
-        self.walls = walls
-        self.active = active
-        self.buttons = buttons
-        self.wall_colors = wall_colors
-        self.button_colors = button_colors
+        self.walls = np.asarray(walls, dtype=bool)
+        self.active = np.asarray(active, dtype=bool)
+        self.buttons = np.asarray(buttons, dtype=bool)
+        self.wall_colors = np.asarray(wall_colors, dtype=np.uint8)
+        self.button_colors = np.asarray(button_colors, dtype=np.uint8)
         self.shape = walls.shape
-        colors_basic = {
-            0: "#ffffff",
-            1: "#000000",
-            2: "#d20000",
-            3: "#de9f00",
-            4: "#00AE00",
-            5: "#0000cd",
-            6: "#8b008b",
-            7: "#739F9F",
-        }
-        self.color_scheme = {i: pygame.Color(c) for i, c in colors_basic.items()}
-        self.spawn = spawn
-        self.target = target
+        self._color_scheme: dict[int, "pygame.Color"] | None = None
+        self.spawn = (int(spawn[0]), int(spawn[1]))
+        self.target = (int(target[0]), int(target[1]))
         self.screen_size = screen_size
+        self._state = 0
+        # Thinking time the racer has left, filled in on the snapshots Game hands out.
+        self.time_left: float | None = None
+        self._render_cache: dict | None = None
+        self.refresh()
+
+    def refresh(self) -> None:
+        """
+        Drop the cached lookups built from the map layers.
+        Call this after editing the layers directly (e.g. from the track builder).
+        Lookups are only built when first needed, so a memory-mapped track reads no
+        layer until something looks at it; the fingerprint reads them all.
+        """
+        self._traversable_grid: np.ndarray | None = None
+        self._traversable_cells: set[Point] | None = None
+        # Lookups that only depend on the layout, so toggling leaves them be:
+        # "fingerprint", and "walls" and "buttons" as (flat index, index by color).
+        self._layout: dict = {}
+
+    @property
+    def _traversable(self) -> np.ndarray:
+        if self._traversable_grid is None:
+            grid = ~self.walls | ~self.active
+            # kept read-only like the layers, so snapshots can share it
+            self._traversable_grid = grid if self.active.flags.writeable else _frozen(grid)
+        return self._traversable_grid
+
+    def _cell_index(self, name: str) -> tuple[np.ndarray, dict[int, np.ndarray]]:
+        """The flat index of every wall or button ("walls" or "buttons"), and grouped by color."""
+        if name not in self._layout:
+            layer, colors = (
+                (self.walls, self.wall_colors)
+                if name == "walls"
+                else (self.buttons, self.button_colors)
+            )
+            index = _frozen(np.flatnonzero(layer))
+            self._layout[name] = index, _index_by_color(index, colors)
+        return self._layout[name]
+
+    @property
+    def color_scheme(self) -> dict[int, "pygame.Color"]:
+        """The pygame color of each wall and button color, made the first time it's needed."""
+        if self._color_scheme is None:
+            import pygame
+
+            self._color_scheme = {i: pygame.Color(c) for i, c in COLOR_SCHEME.items()}
+        return self._color_scheme
+
+    @color_scheme.setter
+    def color_scheme(self, scheme: dict[int, "pygame.Color"]) -> None:
+        self._color_scheme = scheme
+
+    def snapshot(self) -> "RaceTrack":
+        """
+        Make a cheap read-only copy of the track, e.g. to hand to a racer each tick.
+        The copy's layers are read-only for good: nothing reachable from them, .base
+        included, can be made writeable, so a racer can't change the track it came from.
+        Layers that are already like that (those of another snapshot, or of a track
+        memory-mapped from a file) are shared rather than copied, so snapshotting a
+        snapshot copies nothing. This track is left as it was, writeable layers and all.
+        Toggling a snapshot gives it new read-only layers instead of changing the shared ones.
+
+        Returns:
+            RaceTrack: A track with the same layout and state as this one.
+        """
+        track = copy(self)
+        # Views, so changing an array's shape or dtype in place can't reach this track.
+        for name in LAYERS:
+            setattr(track, name, _frozen(getattr(self, name)).view())
+        if self._traversable_grid is not None:
+            track._traversable_grid = _frozen(self._traversable_grid).view()
+        track._traversable_cells = None
+        track._render_cache = None
+        # Whatever lookups this track has built so far are shared; the rest get built by
+        # whichever track needs them.
+        track._layout = {
+            key: (
+                value
+                if isinstance(value, str)
+                else (value[0].view(), {k: v.view() for k, v in value[1].items()})
+            )
+            for key, value in self._layout.items()
+        }
+        if self._color_scheme is not None:
+            track._color_scheme = dict(self._color_scheme)
+        return track
+
+    def fingerprint(self) -> str:
+        """
+        A short hash of the track layout that doesn't change when colors are toggled.
+        Tracks with the same fingerprint and state are the same track in the same state.
+
+        Returns:
+            str: A hex digest of the layers, target and spawn as they were before any toggles.
+        """
+        if "fingerprint" not in self._layout:
+            digest = hashlib.blake2b(digest_size=16)
+            digest.update(repr((self.shape, self.target, self.spawn)).encode())
+            for layer in (
+                self.walls,
+                self.traversable_mask(0),
+                self.buttons,
+                self.wall_colors,
+                self.button_colors,
+            ):
+                digest.update(np.ascontiguousarray(layer).tobytes())
+            self._layout["fingerprint"] = digest.hexdigest()
+        return self._layout["fingerprint"]
+
+    @property
+    def state(self) -> int:
+        """
+        The dynamic state of the track as a bitmask of toggled colors.
+        Bit n is set when color n has been toggled an odd number of times since the
+        track was built, so two tracks with the same layout and state look the same.
+        """
+        return self._state
+
+    def set_state(self, state: int) -> None:
+        """
+        Toggle whichever colors are needed to bring the track into the given state.
+
+        Args:
+            state (int): A bitmask of toggled colors, as returned by the state property.
+        """
+        changed = state ^ self._state
+        color = 0
+        while changed:
+            if changed & 1:
+                self.toggle(color)
+            changed >>= 1
+            color += 1
 
     def __deepcopy__(self, memo) -> "RaceTrack":
-        return RaceTrack(
+        track = RaceTrack(
             deepcopy(self.walls, memo),
             deepcopy(self.active, memo),
             deepcopy(self.buttons, memo),
@@ -60,52 +259,113 @@ class RaceTrack:
             deepcopy(self.spawn, memo),
             deepcopy(self.screen_size, memo),
         )
+        track._state = self._state
+        return track
+
+    def render(self, region: tuple[slice, slice] | None = None) -> "pygame.Surface":
+        """
+        Draw out the track in its current state.
+        The track keeps the surface between calls and only redraws the cells that
+        changed since the last one, so the same surface comes back every time.
+        Copy it if you want to keep a picture of this state or draw on top of it.
+
+        Args:
+            region (tuple[slice, slice] | None, optional): Row and column slices holding every
+                cell that may have changed since the last call, so the rest needn't be checked.
+                Defaults to None - if none, checks the whole track.
+
+        Returns:
+            pygame.Surface: The track's surface.
+        """
+        import pygame
 
-    def render(self) -> pygame.Surface:
-        """Draw out the track in its current state"""
-        surface = pygame.Surface(self.screen_size)
-        surface.fill("#ffffff")
         rows, cols = self.shape
         w, h = self.screen_size[0] / cols, self.screen_size[1] / rows
-        star_img = pygame.image.load("star.png")
-        star_img = pygame.transform.scale(star_img, (0.8 * w, 0.8 * h))
-        triangle = pygame.Surface((0.8 * w, 0.8 * w), pygame.SRCALPHA, 32)
-        triangle = triangle.convert_alpha()
-        pygame.draw.polygon(
-            triangle, "#278B00", [(0.4 * w, 0), (0.8 * w, 0.8 * h), (0, 0.8 * h)]
+        layers = (
+            self.walls,
+            self.active,
+            self.buttons,
+            self.wall_colors,
+            self.button_colors,
         )
-        for row, col in product(range(rows), range(cols)):
-            x, y = col * w, row * h
-            active = self.active[row, col]
-            wall = self.walls[row, col]
-            button = self.buttons[row, col]
-            if wall != 0:
-                wall_color = self.color_scheme[self.wall_colors[row, col]]
-                pygame.draw.rect(
-                    surface,
-                    wall_color,
-                    (x, y, w + 1, h + 1),
-                    0 if active else int(0.2 * min(w, h)),
-                )
-            if (row, col) == self.spawn:
-                surface.blit(triangle, (x + 0.1 * w, y + 0.1 * h))
-            if button:
-                button_color = self.color_scheme[self.button_colors[row, col]]
-                pygame.draw.circle(
-                    surface, button_color, (x + w / 2, y + h / 2), 0.3 * min(w, h)
-                )
-                pygame.draw.circle(
-                    surface,
-                    "#ffffff",
-                    (x + w / 2, y + h / 2),
-                    0.3 * min(w, h),
-                    int(0.05 * min(w, h)),
-                )
-            if (row, col) == self.target:
-                surface.blit(star_img, (x + 0.1 * w, y + 0.1 * h))
-            pygame.draw.rect(surface, "#000000", (x, y, w + 1, h + 1), 2)
+        marks = (self.spawn, self.target)
+        cache = self._render_cache
+        star_img, triangle = _sprites(w, h)
+        if (
+            cache is None
+            or cache["surface"].get_size() != tuple(self.screen_size)
+            or cache["layers"][0].shape != self.shape
+        ):
+            surface = pygame.Surface(self.screen_size)
+            surface.fill("#ffffff")
+            for row in range(rows):
+                for col in range(cols):
+                    self._render_cell(surface, row, col, w, h, star_img, triangle)
+            self._render_cache = {
+                "surface": surface,
+                "layers": tuple(layer.copy() for layer in layers),
+                "marks": marks,
+            }
+            return surface
+        surface = cache["surface"]
+        if region is None:
+            region = (slice(None), slice(None))
+        top, left = region[0].indices(rows)[0], region[1].indices(cols)[0]
+        dirty = np.zeros(layers[0][region].shape, dtype=bool)
+        for layer, drawn in zip(layers, cache["layers"]):
+            dirty |= layer[region] != drawn[region]
+            drawn[region] = layer[region]
+        cells = {(int(row) + top, int(col) + left) for row, col in zip(*np.nonzero(dirty))}
+        if marks != cache["marks"]:
+            cells.update(marks + cache["marks"])
+            cache["marks"] = marks
+        for row, col in sorted(cells):
+            self._render_cell(surface, row, col, w, h, star_img, triangle)
         return surface
 
+    def _render_cell(
+        self,
+        surface: "pygame.Surface",
+        row: int,
+        col: int,
+        w: float,
+        h: float,
+        star_img: "pygame.Surface",
+        triangle: "pygame.Surface",
+    ) -> None:
+        import pygame
+
+        x, y = col * w, row * h
+        active = self.active[row, col]
+        wall = self.walls[row, col]
+        button = self.buttons[row, col]
+        pygame.draw.rect(surface, "#ffffff", (x, y, w + 1, h + 1))
+        if wall != 0:
+            wall_color = self.color_scheme[self.wall_colors[row, col]]
+            pygame.draw.rect(
+                surface,
+                wall_color,
+                (x, y, w + 1, h + 1),
+                0 if active else int(0.2 * min(w, h)),
+            )
+        if (row, col) == self.spawn:
+            surface.blit(triangle, (x + 0.1 * w, y + 0.1 * h))
+        if button:
+            button_color = self.color_scheme[self.button_colors[row, col]]
+            pygame.draw.circle(
+                surface, button_color, (x + w / 2, y + h / 2), 0.3 * min(w, h)
+            )
+            pygame.draw.circle(
+                surface,
+                "#ffffff",
+                (x + w / 2, y + h / 2),
+                0.3 * min(w, h),
+                int(0.05 * min(w, h)),
+            )
+        if (row, col) == self.target:
+            surface.blit(star_img, (x + 0.1 * w, y + 0.1 * h))
+        pygame.draw.rect(surface, "#000000", (x, y, w + 1, h + 1), 2)
+
     def find_wall_locations_np(
         self, color: int | None = None, active: bool | None = None
     ) -> tuple[np.ndarray, np.ndarray]:
@@ -119,13 +379,10 @@ class RaceTrack:
         Returns:
             tuple[np.ndarray, np.ndarray]: A tuple containing an array of all the row numbers and an array of all the column numbers
         """
-        color_mask = (
-            (self.wall_colors == color) if color is not None else np.ones(self.shape)
-        ).astype(int)
-        active_mask = (
-            (self.active == active) if active is not None else np.ones(self.shape)
-        ).astype(int)
-        output = np.where(self.walls.astype(int) & color_mask & active_mask)
+        index = self._wall_index(color)
+        if active is not None:
+            index = index[self.active.flat[index] == active]
+        output = np.unravel_index(index, self.shape)
         assert len(output) == 2
         return output
 
@@ -143,7 +400,7 @@ class RaceTrack:
             set[Point]: A set containing the coordinates (row, col) of walls with the criteria given.
         """
         rows, cols = self.find_wall_locations_np(color, active)
-        return set(zip(rows.astype(int), cols.astype(int)))
+        return set(zip(rows.tolist(), cols.tolist()))
 
     def find_buttons(self, color: int | None = None) -> set[Point]:
         """
@@ -156,27 +413,146 @@ class RaceTrack:
         Returns:
             set[Point]: A set containing the coordinates (row, col) of the buttons.
         """
-        color_mask = (
-            (self.button_colors == color) if color is not None else np.ones(self.shape)
-        ).astype(int)
-        rows, cols = np.where(self.buttons.astype(int) & color_mask)
-        return set(zip(rows.astype(int), cols.astype(int)))
+        all_buttons, by_color = self._cell_index("buttons")
+        index = all_buttons if color is None else by_color.get(int(color), _EMPTY_INDEX)
+        rows, cols = np.unravel_index(index, self.shape)
+        return set(zip(rows.tolist(), cols.tolist()))
 
     def find_traversable_cells(self) -> set[Point]:
         """
         Return a set of all the coordinates (row, col) where your bot can currently exist.
         Buttons and deactivated walls are included in this set.
+        The set is cached and kept up to date by toggle(), so don't modify it.
 
         Returns:
             set[Point]: The locations where you can currently walk.
         """
-        output = np.where((self.walls == 0).astype(int) | (1 - self.active).astype(int))
-        return set(zip(output[0].astype(int), output[1].astype(int)))
+        if self._traversable_cells is None:
+            rows, cols = np.where(self._traversable)
+            self._traversable_cells = set(zip(rows.tolist(), cols.tolist()))
+        return self._traversable_cells
 
-    def toggle(self, color: int) -> None:
-        self.active[self.find_wall_locations_np(color)] = (
-            1 - self.active[self.find_wall_locations_np(color)]
+    def is_traversable(self, row: int, col: int) -> bool:
+        """
+        Check whether your bot can currently exist at (row, col).
+        Out of bounds coordinates are never traversable.
+
+        Args:
+            row (int): The row of the cell.
+            col (int): The column of the cell.
+
+        Returns:
+            bool: True if the cell is in bounds and not blocked by an active wall.
+        """
+        return (
+            0 <= row < self.shape[0]
+            and 0 <= col < self.shape[1]
+            and bool(self._traversable[row, col])
+        )
+
+    def _wall_index(self, color: int | None) -> np.ndarray:
+        all_walls, by_color = self._cell_index("walls")
+        if color is None:
+            return all_walls
+        return by_color.get(int(color), _EMPTY_INDEX)
+
+    def traversable_mask(self, state: int | None = None) -> np.ndarray:
+        """
+        Return a boolean grid that is True wherever your bot can exist.
+
+        Args:
+            state (int | None, optional): The toggle bitmask (see the state property) to evaluate.
+                Defaults to None - if none, uses the track's current state.
+
+        Returns:
+            np.ndarray: A read-only boolean array with the same shape as the track.
+        """
+        if state is None or state == self._state:
+            mask = self._traversable.view()
+        else:
+            mask = self._traversable.copy()
+            changed, color = state ^ self._state, 0
+            while changed:
+                if changed & 1:
+                    index = self._wall_index(color)
+                    mask.flat[index] = ~mask.flat[index]
+                changed >>= 1
+                color += 1
+        mask.flags.writeable = False
+        return mask
+
+    def distance_field(self, source: Point, state: int | None = None) -> np.ndarray:
+        """
+        Find the number of moves from source to every cell, without pressing any buttons.
+
+        Args:
+            source (Point): The (row, col) to measure from.
+            state (int | None, optional): The toggle bitmask to walk through. Defaults to the current state.
+
+        Returns:
+            np.ndarray: An int array the shape of the track, holding -1 where a cell can't be reached.
+        """
+        return self.multi_source_distance_field([source], state)
+
+    def multi_source_distance_field(
+        self, sources: Iterable[Point], state: int | None = None
+    ) -> np.ndarray:
+        """
+        Find the number of moves from the nearest of several sources to every cell,
+        without pressing any buttons.
+
+        Args:
+            sources (Iterable[Point]): The (row, col) cells to measure from.
+            state (int | None, optional): The toggle bitmask to walk through. Defaults to the current state.
+
+        Returns:
+            np.ndarray: An int array the shape of the track, holding -1 where a cell can't be reached.
+        """
+        rows, cols = self.shape
+        width = cols + 2
+        # Pad with a ring of walls so neighbor offsets never leave the grid.
+        unvisited = np.zeros((rows + 2, width), dtype=bool)
+        unvisited[1:-1, 1:-1] = self.traversable_mask(state)
+        unvisited = unvisited.ravel()
+        dist = np.full(unvisited.size, -1, dtype=np.int32)
+        frontier = np.unique(
+            np.array([(r + 1) * width + c + 1 for r, c in sources], dtype=np.intp)
         )
+        dist[frontier] = 0
+        unvisited[frontier] = False
+        steps = np.array([-width, width, -1, 1], dtype=np.intp)
+        distance = 0
+        while frontier.size:
+            distance += 1
+            neighbors = (frontier[:, None] + steps).ravel()
+            frontier = np.unique(neighbors[unvisited[neighbors]])
+            unvisited[frontier] = False
+            dist[frontier] = distance
+        return dist.reshape(rows + 2, width)[1:-1, 1:-1].copy()
+
+    def toggle(self, color: int) -> None:
+        rows, cols = np.unravel_index(self._wall_index(color), self.shape)
+        # Read-only layers (a snapshot's, or a memory-mapped file's) are replaced, not written.
+        read_only = not self.active.flags.writeable
+        if read_only:
+            self.active = self.active.copy()
+        grid = self._traversable
+        if not grid.flags.writeable:
+            grid = grid.copy()
+        self.active[rows, cols] = ~self.active[rows, cols]
+        self._state ^= 1 << int(color)
+        now_open = ~self.active[rows, cols]
+        grid[rows, cols] = now_open
+        if read_only:
+            self.active = _frozen(self.active)
+            grid = _frozen(grid)
+        self._traversable_grid = grid
+        if self._traversable_cells is not None:
+            for point, is_open in zip(zip(rows.tolist(), cols.tolist()), now_open):
+                if is_open:
+                    self._traversable_cells.add(point)
+                else:
+                    self._traversable_cells.discard(point)
 
     def get_grid_coord(self, x: float, y: float) -> tuple[int, int]:
         rows, cols = self.shape
@@ -184,35 +560,169 @@ class RaceTrack:
         return int(y / h), int(x / w)
 
     def save(self, filename: str) -> None:
-        save_data = (
-            self.walls,
-            self.active,
-            self.buttons,
-            self.wall_colors,
-            self.button_colors,
-            self.target,
-            self.spawn,
-            self.screen_size,
-        )
-        with open(filename, "wb") as f:
+        """
+        Save the track in its current state. Filenames ending in .pkl get the old
+        pickle format; anything else gets a versioned track file (see load_track).
+        The file is written next to filename and then moved over it, so a track can be
+        saved over the file it was memory-mapped from.
+        """
+        temp = f"{filename}.{os.getpid()}.tmp"
+        try:
+            with open(temp, "wb") as f:
+                self._write(f, filename.endswith(".pkl"))
+            os.replace(temp, filename)
+        except BaseException:
+            if os.path.exists(temp):
+                os.remove(temp)
+            raise
+
+    def _write(self, f: BinaryIO, as_pickle: bool) -> None:
+        if as_pickle:
+            save_data = (
+                self.walls,
+                self.active,
+                self.buttons,
+                self.wall_colors,
+                self.button_colors,
+                self.target,
+                self.spawn,
+                self.screen_size,
+            )
             pickle.dump(save_data, f)
+            return
+        header = {
+            "shape": list(self.shape),
+            "target": list(self.target),
+            "spawn": list(self.spawn),
+            "screen_size": list(self.screen_size),
+            "layers": {},
+        }
+        layers = {name: np.ascontiguousarray(getattr(self, name)) for name in LAYERS}
+        # Offsets depend on the header's length, so lay it out until it stops growing.
+        data_start = 0
+        while True:
+            offset = data_start
+            for name, layer in layers.items():
+                header["layers"][name] = {"dtype": layer.dtype.str, "offset": offset}
+                offset = _align(offset + layer.nbytes)
+            encoded = json.dumps(header).encode()
+            needed = _align(len(TRACK_FILE_MAGIC) + 8 + len(encoded))
+            if needed <= data_start:
+                break
+            data_start = needed
+        f.write(TRACK_FILE_MAGIC)
+        f.write(struct.pack("<II", TRACK_FILE_VERSION, len(encoded)))
+        f.write(encoded)
+        for name, layer in layers.items():
+            f.seek(header["layers"][name]["offset"])
+            f.write(layer.tobytes())
+
 
+def _align(offset: int) -> int:
+    return -(-offset // _LAYER_ALIGNMENT) * _LAYER_ALIGNMENT
 
-def load_track(filename: str) -> RaceTrack:
+
+def is_track_file(filename: str) -> bool:
+    """Check whether a file is in the versioned track format rather than a pickle."""
     with open(filename, "rb") as f:
-        data = pickle.load(f)
-    track = RaceTrack(*data)
-    return track
+        return f.read(len(TRACK_FILE_MAGIC)) == TRACK_FILE_MAGIC
+
+
+def read_track_header(filename: str) -> dict:
+    """
+    Read the header of a versioned track file without touching any layer data.
+
+    Returns:
+        dict: The shape, target, spawn, screen_size and where each layer is stored.
+    """
+    with open(filename, "rb") as f:
+        if f.read(len(TRACK_FILE_MAGIC)) != TRACK_FILE_MAGIC:
+            raise ValueError(f"{filename} is not a track file.")
+        version, header_length = struct.unpack("<II", f.read(8))
+        if version > TRACK_FILE_VERSION:
+            raise ValueError(
+                f"{filename} is track file version {version}, but only versions up to "
+                f"{TRACK_FILE_VERSION} can be read."
+            )
+        return json.loads(f.read(header_length))
+
+
+def load_layer(
+    filename: str, name: str, mmap: bool = True, header: dict | None = None
+) -> np.ndarray:
+    """
+    Load a single layer of a versioned track file.
+
+    Args:
+        filename (str): The track file.
+        name (str): One of LAYERS, e.g. "walls".
+        mmap (bool, optional): Memory-map the layer read-only instead of reading it in. Defaults to True.
+        header (dict | None, optional): The file's header, if already read. Defaults to None.
+
+    Returns:
+        np.ndarray: The layer. Memory-mapped layers are read-only and only paged in as they are used.
+    """
+    header = read_track_header(filename) if header is None else header
+    layer = header["layers"][name]
+    shape = tuple(header["shape"])
+    if mmap:
+        return np.memmap(
+            filename, dtype=layer["dtype"], mode="r", offset=layer["offset"], shape=shape
+        )
+    with open(filename, "rb") as f:
+        f.seek(layer["offset"])
+        return np.fromfile(f, dtype=layer["dtype"], count=shape[0] * shape[1]).reshape(shape)
+
+
+def load_track(
+    filename: str, mmap: bool = True, allow_pickle: bool | None = None
+) -> RaceTrack:
+    """
+    Load a track saved with RaceTrack.save, in either the track file or the old pickle format.
+
+    Args:
+        filename (str): The file to load.
+        mmap (bool, optional): Memory-map a track file's layers read-only rather than reading
+            them in. Nothing is read from a mapped layer until the track needs it. Toggling
+            still works (the active layer gets copied), but pass False if you want to edit
+            the layers. Ignored for pickles. Defaults to True.
+        allow_pickle (bool | None, optional): Whether a file in the old pickle format may be
+            loaded. Unpickling can run arbitrary code, so only do it for tracks you trust.
+            Defaults to None - if none, only files named *.pkl are unpickled.
+
+    Returns:
+        RaceTrack: The track.
+    """
+    if not is_track_file(filename):
+        if allow_pickle is None:
+            allow_pickle = filename.endswith(".pkl")
+        if not allow_pickle:
+            raise ValueError(
+                f"{filename} is not a track file, and pickles are only loaded from .pkl "
+                "files (or with allow_pickle=True)."
+            )
+        # Older tracks were saved with float64 layers; RaceTrack narrows them on load.
+        with open(filename, "rb") as f:
+            data = pickle.load(f)
+        return RaceTrack(*data)
+    header = read_track_header(filename)
+    layers = [load_layer(filename, name, mmap, header) for name in LAYERS]
+    return RaceTrack(
+        *layers,
+        tuple(header["target"]),
+        tuple(header["spawn"]),
+        tuple(header["screen_size"]),
+    )
 
 
 def blank_track(
     grid_size: tuple[int, int], screen_size: tuple[int, int], n_colors: int
 ) -> RaceTrack:
-    walls = np.zeros(grid_size)
-    buttons = np.zeros(grid_size)
-    active = np.ones(grid_size)
-    wall_colors = np.zeros(grid_size)
-    button_colors = np.zeros(grid_size)
+    walls = np.zeros(grid_size, dtype=bool)
+    buttons = np.zeros(grid_size, dtype=bool)
+    active = np.ones(grid_size, dtype=bool)
+    wall_colors = np.zeros(grid_size, dtype=np.uint8)
+    button_colors = np.zeros(grid_size, dtype=np.uint8)
     return RaceTrack(
         walls,
         active,
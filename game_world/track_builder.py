@@ -1,17 +1,25 @@
+import os
 import sys
 
+if __package__ in (None, ""):
+    # run as a script: make the game_world package importable
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 import pygame
 import pygame.locals
 
-from racetrack import RaceTrack, blank_track, load_track
+from game_world.planner import LiveSolver
+from game_world.racetrack import RaceTrack, blank_track, load_track
 
 WIDTH = 600
 GRID_SIZE = (5, 5)
 # Where do you want to save this track? (Press 'enter' to save)
-SAVE_FILE_NAME = "tracks/your_room.pkl"
+SAVE_FILE_NAME = "tracks/your_room.pkl"  # .pkl for the old format, anything else (e.g. .track) for the new one
 STARTING_TRACK_NAME = None  # None if you want to start blank.
+SHOW_SOLUTION = True  # draw the shortest solution (or where the racer can get) over the track
 # Hold A to paint in deactivated walls
 # press up and down on arrow keys to increase brush size
+# The par (fewest moves to finish) under the buttons updates by itself as you paint
 
 
 class Button:
@@ -52,38 +60,54 @@ def click_track(
     mx: int,
     my: int,
     cursor_size: int,
-    handled_points: set[tuple[int, int]],
     shift_held: bool,
-):
+) -> tuple[slice, slice] | None:
+    """
+    Paint the brush centered on the mouse onto the track.
+    Returns the (rows, cols) slices it covered, or None if it missed the track.
+    """
     row, col = track.get_grid_coord(mx, my)
-    for r in range(row - cursor_size + 1, row + cursor_size):
-        for c in range(col - cursor_size + 1, col + cursor_size):
-            if (
-                r not in range(track.shape[0])
-                or c not in range(track.shape[1])
-                or (r, c) in handled_points
-            ):
-                continue
-            handled_points.add((r, c))
-            match selected_kind:
-                case "wall":
-                    if selected_color != 0:
-                        track.walls[r, c] = 1
-                        track.active[r, c] = 1 - int(shift_held)
-                    else:
-                        track.walls[r, c] = 0
-                    track.wall_colors[r, c] = selected_color
-                case "button":
-                    track.buttons[r, c] = 0 if selected_color == 0 else 1
-                    track.button_colors[r, c] = (
-                        track.button_colors[r, c]
-                        if selected_color == 0
-                        else selected_color
-                    )
-                case "target":
-                    track.target = (r, c)
-                case "spawn":
-                    track.spawn = (r, c)
+    rows = slice(max(row - cursor_size + 1, 0), min(row + cursor_size, track.shape[0]))
+    cols = slice(max(col - cursor_size + 1, 0), min(col + cursor_size, track.shape[1]))
+    if rows.start >= rows.stop or cols.start >= cols.stop:
+        return None
+    brush = (rows, cols)
+    match selected_kind:
+        case "wall":
+            track.walls[brush] = selected_color != 0
+            if selected_color != 0:
+                track.active[brush] = not shift_held
+            track.wall_colors[brush] = selected_color
+        case "button":
+            track.buttons[brush] = selected_color != 0
+            if selected_color != 0:
+                track.button_colors[brush] = selected_color
+        case "target" | "spawn":
+            if not (0 <= row < track.shape[0] and 0 <= col < track.shape[1]):
+                return None
+            setattr(track, selected_kind, (row, col))
+    return brush
+
+
+def solution_overlay(
+    track: RaceTrack, path: list[tuple[int, int]], reachable
+) -> pygame.Surface:
+    """
+    A see-through surface the size of the track showing a LiveSolver result: the path
+    through the cells of a solution, or a tint over every cell a racer can reach.
+    """
+    rows, cols = track.shape
+    w, h = track.screen_size[0] / cols, track.screen_size[1] / rows
+    if reachable is not None:
+        tint = pygame.Surface((cols, rows), pygame.SRCALPHA)
+        tint.fill("#FF8800")
+        pygame.surfarray.pixels_alpha(tint)[:] = reachable.T * 90
+        return pygame.transform.scale(tint, track.screen_size)
+    overlay = pygame.Surface(track.screen_size, pygame.SRCALPHA)
+    if len(path) > 1:
+        points = [((col + 0.5) * w, (row + 0.5) * h) for row, col in path]
+        pygame.draw.lines(overlay, "#FF8800", False, points, max(2, int(0.15 * min(w, h))))
+    return overlay
 
 
 def main():
@@ -94,11 +118,15 @@ def main():
     screen = pygame.display.set_mode((screen_size[0] + 170, max(screen_size[1], 450)))
 
     track = (
-        load_track(STARTING_TRACK_NAME)
+        load_track(STARTING_TRACK_NAME, mmap=False)
         if STARTING_TRACK_NAME
         else blank_track(GRID_SIZE, screen_size, 7)
     )
     track_surface = track.render()
+    solver = LiveSolver(track)
+    solved = 0
+    overlay = None
+    font = pygame.font.Font(None, 26)
     color_buttons = {
         i: make_solid_colored_button(screen_size[0] + 30, 20 + 50 * i, 30, 30, color)
         for i, color in track.color_scheme.items()
@@ -126,7 +154,6 @@ def main():
     shift_held = False
 
     cursor_size = 1
-    handled_points = set()
 
     while True:
         screen.fill("#A6A6A6")
@@ -145,7 +172,8 @@ def main():
                         selected_kind = kind
             elif event.type == pygame.locals.MOUSEBUTTONUP:
                 pressed = False
-                handled_points.clear()
+                # the lookups only need to be up to date once the stroke is finished
+                track.refresh()
             elif event.type == pygame.locals.KEYDOWN:
                 if event.key == pygame.K_UP:
                     cursor_size += 1
@@ -161,19 +189,31 @@ def main():
                     shift_held = False
 
         if pressed:
-            click_track(
+            brush = click_track(
                 track,
                 selected_color,
                 selected_kind,
                 mx,
                 my,
                 cursor_size,
-                handled_points,
                 shift_held,
             )
-            track_surface = track.render()
-
+            if brush is not None:
+                track_surface = track.render(brush)
+                solver.edit(track, brush)
+
+        if solver.solved != solved:
+            solved = solver.solved
+            par, path, reachable = solver.result
+            overlay = solution_overlay(track, path, reachable)
         screen.blit(track_surface, (0, 0))
+        if SHOW_SOLUTION and overlay is not None:
+            screen.blit(overlay, (0, 0))
+        par = solver.result[0]
+        status = "unsolvable" if par is None else f"par {par}"
+        if solver.busy:
+            status += "..."
+        screen.blit(font.render(status, True, "#000000"), (screen_size[0] + 20, 410))
         for i, button in color_buttons.items():
             button.blit(screen, i == selected_color)
         for kind, button in type_buttons.items():
@@ -0,0 +1,171 @@
+import argparse
+import json
+import os
+
+import numpy as np
+
+from game_world.planner import plan
+from game_world.racetrack import RaceTrack, blank_track
+
+Point = tuple[int, int]
+MAX_COLOR = 7  # colors 2..7 can be gates or traps; 1 (black) is for permanent walls
+SIZES = [50, 200, 1000]
+
+
+def _free_cells(track: RaceTrack, rows: slice, rng: np.random.Generator, count: int) -> list[Point]:
+    """Pick up to count distinct empty, button-free cells within a band of rows."""
+    band = ~track.walls[rows] & ~track.buttons[rows]
+    r, c = np.nonzero(band)
+    if r.size == 0:
+        return []
+    picks = rng.choice(r.size, size=min(count, r.size), replace=False)
+    return [(int(r[i]) + rows.start, int(c[i])) for i in picks]
+
+
+def _build(
+    shape: tuple[int, int],
+    wall_density: float,
+    n_gates: int,
+    buttons_per_gate: int,
+    n_traps: int,
+    trap_buttons: int,
+    rng: np.random.Generator,
+    screen_size: Point,
+) -> RaceTrack:
+    rows, cols = shape
+    track = blank_track(shape, screen_size, MAX_COLOR)
+    track.walls[:] = rng.random(shape) < wall_density
+    track.wall_colors[track.walls] = 1
+
+    # Full-width lines of colored walls split the track into bands, top to bottom.
+    # Gates start closed and need their button; traps start open and close if you
+    # step off one of their buttons.
+    kinds = ["gate"] * n_gates + ["trap"] * n_traps
+    rng.shuffle(kinds)
+    n_bands = len(kinds) + 1
+    edges = np.linspace(0, rows, n_bands + 1).astype(int)
+    lines = [
+        int(rng.integers(edges[i] + 1, edges[i + 1])) if edges[i + 1] - edges[i] > 1 else int(edges[i + 1])
+        for i in range(len(kinds))
+    ]
+    top = 0
+    for color, (kind, line) in enumerate(zip(kinds, lines), start=2):
+        track.walls[line, :] = True
+        track.wall_colors[line, :] = color
+        track.active[line, :] = kind == "gate"
+        count = buttons_per_gate if kind == "gate" else trap_buttons
+        for point in _free_cells(track, slice(top, line), rng, count):
+            track.buttons[point] = True
+            track.button_colors[point] = color
+        top = line + 1
+
+    first_band = slice(0, lines[0] if lines else rows)
+    last_band = slice(lines[-1] + 1 if lines else 0, rows)
+    spawn = _free_cells(track, first_band, rng, 1)
+    target = _free_cells(track, last_band, rng, 1)
+    track.spawn = spawn[0] if spawn else (0, 0)
+    track.target = target[0] if target else (rows - 1, cols - 1)
+    for point in (track.spawn, track.target):
+        track.walls[point] = False
+        track.buttons[point] = False
+    track.refresh()
+    return track
+
+
+def generate_track(
+    shape: tuple[int, int] = (50, 50),
+    wall_density: float = 0.2,
+    n_gates: int = 2,
+    buttons_per_gate: int = 2,
+    n_traps: int = 1,
+    trap_buttons: int = 3,
+    seed: int | None = None,
+    screen_size: Point = (600, 600),
+    max_attempts: int = 20,
+) -> tuple[RaceTrack, list[Point]]:
+    """
+    Generate a random track that is known to be solvable.
+
+    Args:
+        shape (tuple[int, int], optional): Rows and columns. Defaults to (50, 50).
+        wall_density (float, optional): Chance of each cell holding a black wall. Defaults to 0.2.
+        n_gates (int, optional): Closed lines of colored walls, each with buttons above it. Defaults to 2.
+        buttons_per_gate (int, optional): Buttons that open each gate. Defaults to 2.
+        n_traps (int, optional): Open lines of colored walls that close if you step off their buttons. Defaults to 1.
+        trap_buttons (int, optional): Buttons scattered above each trap. Defaults to 3.
+        seed (int | None, optional): Seed for the random generator, for repeatable tracks. Defaults to None.
+        screen_size (Point, optional): Screen size stored on the track. Defaults to (600, 600).
+        max_attempts (int, optional): How many layouts to try before giving up. Defaults to 20.
+
+    Returns:
+        tuple[RaceTrack, list[Point]]: The track and an optimal solution; its length is the track's par.
+    """
+    if n_gates + n_traps > MAX_COLOR - 1:
+        raise ValueError(f"At most {MAX_COLOR - 1} gates and traps fit in the color scheme.")
+    if n_gates + n_traps >= shape[0]:
+        raise ValueError("The track needs more rows than it has gates and traps.")
+    rng = np.random.default_rng(seed)
+    for _ in range(max_attempts):
+        track = _build(
+            shape,
+            wall_density,
+            n_gates,
+            buttons_per_gate,
+            n_traps,
+            trap_buttons,
+            rng,
+            screen_size,
+        )
+        solution = plan(track)
+        if solution is not None:
+            return track, solution
+    raise ValueError(
+        f"No solvable track found in {max_attempts} attempts; try a lower wall density."
+    )
+
+
+def build_corpus(
+    out_dir: str, sizes: list[int], count: int, seed: int = 0, **options
+) -> dict[str, dict]:
+    """
+    Generate count tracks of each size into out_dir, along with a corpus.json index
+    holding every track's seed, settings and par.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    index = {}
+    for size in sizes:
+        for i in range(count):
+            track_seed = seed + i
+            track, solution = generate_track((size, size), seed=track_seed, **options)
+            name = f"generated_{size}_{i}.track"
+            track.save(os.path.join(out_dir, name))
+            index[name] = {"seed": track_seed, "size": size, "par": len(solution)} | options
+            print(f"{name}: par {len(solution)}")
+    with open(os.path.join(out_dir, "corpus.json"), "w") as f:
+        json.dump(index, f, indent=2)
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a corpus of solvable tracks.")
+    parser.add_argument("--out", default="tracks/generated")
+    parser.add_argument("--sizes", nargs="+", type=int, default=SIZES)
+    parser.add_argument("--count", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--wall-density", type=float, default=0.2)
+    parser.add_argument("--gates", type=int, default=2)
+    parser.add_argument("--traps", type=int, default=1)
+    args = parser.parse_args()
+    build_corpus(
+        args.out,
+        args.sizes,
+        args.count,
+        args.seed,
+        wall_density=args.wall_density,
+        n_gates=args.gates,
+        n_traps=args.traps,
+    )
+
+
+if __name__ == "__main__":
+    main()
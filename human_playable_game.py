@@ -1,4 +1,3 @@
-from copy import deepcopy
 from enum import Enum
 import sys
 from time import monotonic
@@ -44,7 +43,7 @@ class Game:
         max_turns_without_progress: int = 100,
     ) -> None:
         self.player = player
-        self.track = deepcopy(track)
+        self.track = track.snapshot()
         self.time = time
         self.delay = delay
         self.turns_without_progress = 0
@@ -74,18 +73,17 @@ class Game:
             self.track.toggle(self.track.button_colors[self.pos])
         options = {(1, 0), (-1, 0), (0, 1), (0, -1)}
         self.pos = (self.pos[0] + action[0], self.pos[1] + action[1])
-        if self.track.buttons[self.pos]:
-            dupe = deepcopy(self.track)
+        rows, cols = self.track.shape
+        in_bounds = 0 <= self.pos[0] < rows and 0 <= self.pos[1] < cols
+        if in_bounds and self.track.buttons[self.pos]:
+            dupe = self.track.snapshot()
             dupe.toggle(self.track.button_colors[self.pos])
             self.surface = dupe.render()
         if action not in options:
             return Status.DNF, f"Racer made illegal move {action}!", self.surface
-        if not (
-            self.pos[0] in range(self.track.shape[0])
-            and self.pos[1] in range(self.track.shape[1])
-        ):
+        if not in_bounds:
             return Status.DNF, "Racer went out of bounds!", self.surface
-        if not self.pos in self.track.find_traversable_cells():
+        if not self.track.is_traversable(*self.pos):
             return Status.DNF, "Racer crashed into a wall!", self.surface
         new_dist = manhattan_dist(self.pos, self.track.target)
         if new_dist < self.min_dist:
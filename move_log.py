@@ -0,0 +1,328 @@
+import argparse
+from collections.abc import Iterable, Iterator
+from enum import IntEnum
+import glob
+import json
+import struct
+from time import perf_counter
+
+import numpy as np
+
+from game import Game, Player, Point, Status, replay_player_generator
+from game_world.racetrack import RaceTrack, load_track
+
+TRACKS = "tracks/*.pkl"
+# An archive is MOVE_LOG_MAGIC and the version as a little-endian uint32, then records.
+MOVE_LOG_MAGIC = b"RACELOG\x00"
+MOVE_LOG_VERSION = 2
+# A move's code is its index here; ILLEGAL stands for a move outside the rules, which
+# can only be a game's last and is kept in the record's reason as it was.
+MOVES: list[Point] = [(1, 0), (-1, 0), (0, 1), (0, -1), (0, 0)]
+ILLEGAL = len(MOVES)
+BITS = 3
+# How Game.tick's messages start for endings that depend on the racer, not its moves
+TIMED_OUT = "Timed Out"
+CRASHED = "Racer crashed with"
+# The tournament's message for a game it stopped for taking too long in real time
+WALL_CLOCK_EXCEEDED = "Exceeded the {}s wall-clock limit."
+# Each record starts with the track's fingerprint digest, the ending (with HAS_SEED set
+# if a seed follows) and the number of moves
+_RECORD = struct.Struct("<16sBI")
+_SEED = struct.Struct("<q")
+HAS_SEED = 0x80
+MAX_REASON = 255  # bytes of UTF-8; the reason's length is stored in one byte
+_CODES = {move: code for code, move in enumerate(MOVES)}
+_MOVE_TABLE = MOVES + [None] * (2**BITS - len(MOVES))
+_PLACES = np.array([1 << (BITS - 1 - i) for i in range(BITS)], dtype=np.uint8)
+
+
+class Ending(IntEnum):
+    """How a game ended, as stored in a record's result byte."""
+
+    ONGOING = 0
+    FINISHED = 1
+    ILLEGAL_MOVE = 2
+    OUT_OF_BOUNDS = 3
+    HIT_WALL = 4
+    DAWDLED = 5
+    TIMED_OUT = 6
+    CRASHED = 7
+    WALL_CLOCK = 8
+    OTHER = 9  # a message none of the above start with
+
+
+# How each ending's message starts
+_MESSAGES = {
+    Ending.FINISHED: "Racer made it to the finish line",
+    Ending.ILLEGAL_MOVE: "Racer made illegal move",
+    Ending.OUT_OF_BOUNDS: "Racer went out of bounds!",
+    Ending.HIT_WALL: "Racer crashed into a wall!",
+    Ending.DAWDLED: "Racer spent",
+    Ending.TIMED_OUT: TIMED_OUT,
+    Ending.CRASHED: CRASHED,
+    Ending.WALL_CLOCK: WALL_CLOCK_EXCEEDED.partition("{")[0],
+}
+# Endings that replaying the moves alone should reproduce
+_DECIDED_BY_MOVES = {
+    Ending.FINISHED,
+    Ending.ILLEGAL_MOVE,
+    Ending.OUT_OF_BOUNDS,
+    Ending.HIT_WALL,
+    Ending.DAWDLED,
+}
+
+
+def ending_of(status: Status, message: str) -> Ending:
+    """Work out which Ending a game's last tick result was."""
+    if status == Status.ONGOING:
+        return Ending.ONGOING
+    for ending, start in _MESSAGES.items():
+        if message.startswith(start):
+            return ending
+    return Ending.OTHER
+
+
+def _short(text: str) -> str:
+    """text cut down to MAX_REASON bytes of UTF-8."""
+    return text.encode()[:MAX_REASON].decode(errors="ignore")
+
+
+class MoveLog:
+    """
+    A game's moves packed at 3 bits each, along with which track it was played on (by
+    fingerprint), the seed used if any, and how it ended.
+
+    Iterating gives the moves back in order, each in constant time, so a log can be
+    handed straight to replay_player_generator. to_bytes() and from_bytes() turn logs
+    into self-delimiting records, so any number can be written one after another into
+    an archive (see save_archive). A record is a fixed 21 bytes, the seed if there is
+    one, a short reason and then the moves, so a 6-move game takes 25 bytes.
+
+    The reason is the illegal move, if the last move was one; otherwise it's the last
+    line of the message for endings that have no fixed message (crashes and OTHER).
+    Full messages aren't kept.
+    """
+
+    def __init__(
+        self,
+        codes: np.ndarray,
+        fingerprint: str = "",
+        seed: int | None = None,
+        ending: Ending = Ending.ONGOING,
+        reason: str = "",
+    ) -> None:
+        self.codes = np.asarray(codes, dtype=np.uint8)
+        self.fingerprint = fingerprint
+        self.seed = seed
+        self.ending = Ending(ending)
+        self.reason = _short(reason)
+
+    @classmethod
+    def from_history(
+        cls,
+        history: list[Point],
+        fingerprint: str = "",
+        seed: int | None = None,
+        status: Status = Status.ONGOING,
+        message: str = "",
+    ) -> "MoveLog":
+        """Pack a list of moves such as Game.history, along with the game's last tick result."""
+        codes = np.fromiter(
+            (_CODES.get(move, ILLEGAL) for move in history), np.uint8, len(history)
+        )
+        if (codes[:-1] == ILLEGAL).any():
+            raise ValueError("Only a game's last move can be illegal.")
+        ending = ending_of(status, message)
+        lines = message.strip().splitlines()
+        reason = lines[-1] if lines and ending in (Ending.CRASHED, Ending.OTHER) else ""
+        if codes.size and codes[-1] == ILLEGAL:
+            # strings and tuples of plain values are kept so they play back as they were;
+            # anything else as its repr
+            reason = history[-1] if isinstance(history[-1], str) else repr(history[-1])
+            if isinstance(history[-1], (tuple, list)):
+                try:
+                    reason = json.dumps(list(history[-1]))
+                except TypeError:
+                    pass
+        return cls(codes, fingerprint, seed, ending, reason)
+
+    @classmethod
+    def from_game(
+        cls, game: Game, status: Status, message: str, seed: int | None = None
+    ) -> "MoveLog":
+        """Log a finished game, along with the result its last tick returned."""
+        return cls.from_history(game.history, game.track.fingerprint(), seed, status, message)
+
+    @property
+    def status(self) -> Status:
+        if self.ending == Ending.ONGOING:
+            return Status.ONGOING
+        return Status.FINISH if self.ending == Ending.FINISHED else Status.DNF
+
+    @property
+    def illegal(self) -> Point | str | None:
+        """The illegal last move, if there was one."""
+        if not self.codes.size or self.codes[-1] != ILLEGAL:
+            return None
+        try:
+            return tuple(json.loads(self.reason))
+        except (ValueError, TypeError):
+            return self.reason
+
+    def __len__(self) -> int:
+        return int(self.codes.size)
+
+    def __iter__(self) -> Iterator[Point]:
+        illegal = self.illegal
+        for code in self.codes.tolist():
+            yield illegal if code == ILLEGAL else _MOVE_TABLE[code]
+
+    def moves(self) -> list[Point]:
+        return list(self)
+
+    def timed_out(self) -> bool:
+        # Game logs the move that ran out the clock, but never makes it
+        return self.ending == Ending.TIMED_OUT
+
+    def decided_by_moves(self) -> bool:
+        """Whether replaying the moves alone should reproduce how the game ended."""
+        return self.ending in _DECIDED_BY_MOVES
+
+    def player(self) -> Player:
+        """A player that makes this log's moves, then stands still."""
+        return replay_player_generator(self)
+
+    def to_bytes(self) -> bytes:
+        """
+        The log as one record, little-endian: the fingerprint's 16 digest bytes (zeros if
+        there's none), the ending as a byte with HAS_SEED set if there's a seed, the
+        number of moves as a uint32, the seed as an int64 if there is one, the reason's
+        length as a byte and its UTF-8, then the moves' codes as BITS-bit groups, most
+        significant bit first, padded out to a whole byte.
+        """
+        digest = bytes.fromhex(self.fingerprint) if self.fingerprint else bytes(16)
+        if len(digest) != 16:
+            raise ValueError(f"Fingerprint {self.fingerprint!r} isn't 16 bytes of hex.")
+        result = self.ending | (HAS_SEED if self.seed is not None else 0)
+        reason = self.reason.encode()
+        bits = (self.codes[:, None] & _PLACES) != 0
+        return (
+            _RECORD.pack(digest, result, len(self))
+            + (b"" if self.seed is None else _SEED.pack(self.seed))
+            + bytes([len(reason)])
+            + reason
+            + np.packbits(bits.ravel()).tobytes()
+        )
+
+    @classmethod
+    def from_bytes(cls, data: bytes, offset: int = 0) -> tuple["MoveLog", int]:
+        """
+        Read one record from data, starting at offset.
+
+        Returns:
+            tuple[MoveLog, int]: The log and the offset just past its record.
+        """
+        view = memoryview(data)
+        digest, result, count = _RECORD.unpack_from(view, offset)
+        end = offset + _RECORD.size
+        seed = None
+        if result & HAS_SEED:
+            (seed,) = _SEED.unpack_from(view, end)
+            end += _SEED.size
+        reason_length = view[end]
+        reason = bytes(view[end + 1 : end + 1 + reason_length]).decode()
+        end += 1 + reason_length
+        packed_length = -(-count * BITS // 8)
+        bits = np.unpackbits(np.frombuffer(view[end : end + packed_length], dtype=np.uint8))
+        codes = bits[: count * BITS].reshape(count, BITS) @ _PLACES
+        fingerprint = digest.hex() if any(digest) else ""
+        log = cls(codes, fingerprint, seed, Ending(result & ~HAS_SEED), reason)
+        return log, end + packed_length
+
+    def save(self, filename: str) -> None:
+        save_archive(filename, [self])
+
+    @classmethod
+    def load(cls, filename: str) -> "MoveLog":
+        return next(load_archive(filename))
+
+
+def save_archive(filename: str, logs: Iterable[MoveLog]) -> None:
+    """Write any number of logs into one file, back to back after the archive header."""
+    with open(filename, "wb") as f:
+        f.write(MOVE_LOG_MAGIC + struct.pack("<I", MOVE_LOG_VERSION))
+        for log in logs:
+            f.write(log.to_bytes())
+
+
+def load_archive(filename: str) -> Iterator[MoveLog]:
+    """Read every log from a file written by save_archive, in order."""
+    with open(filename, "rb") as f:
+        data = f.read()
+    if data[: len(MOVE_LOG_MAGIC)] != MOVE_LOG_MAGIC:
+        raise ValueError(f"{filename} is not a move log archive.")
+    offset = len(MOVE_LOG_MAGIC)
+    (version,) = struct.unpack_from("<I", data, offset)
+    if version != MOVE_LOG_VERSION:
+        raise ValueError(
+            f"{filename} is move log version {version}, but only version "
+            f"{MOVE_LOG_VERSION} can be read."
+        )
+    offset += 4
+    while offset < len(data):
+        log, offset = MoveLog.from_bytes(data, offset)
+        yield log
+
+
+def replay_log(log: MoveLog, track: RaceTrack) -> tuple[Status, str]:
+    """
+    Play a log back through Game with no display and no time limit.
+
+    Returns:
+        tuple[Status, str]: How the replayed game ended. A game that timed out or crashed
+            replays as still ongoing, since how it ended was up to the racer, not its moves.
+    """
+    if log.fingerprint and log.fingerprint != track.fingerprint():
+        raise ValueError("This log was recorded on a different track.")
+    game = Game(log.player(), track, float("inf"), 0)
+    status, msg = Status.ONGOING, "Just Started."
+    for _ in range(len(log) - log.timed_out()):
+        status, msg = game.tick()
+        if status != Status.ONGOING:
+            break
+    return status, msg
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Replay an archive of move logs without a display."
+    )
+    parser.add_argument("archive")
+    parser.add_argument(
+        "--tracks", nargs="+", default=sorted(glob.glob(TRACKS)), help="tracks the games were on"
+    )
+    args = parser.parse_args()
+    tracks = {}
+    for track_file in args.tracks:
+        track = load_track(track_file)
+        tracks[track.fingerprint()] = track
+    start = perf_counter()
+    games = moves = unknown = mismatches = 0
+    for log in load_archive(args.archive):
+        if log.fingerprint not in tracks:
+            unknown += 1
+            continue
+        status, msg = replay_log(log, tracks[log.fingerprint])
+        games += 1
+        moves += len(log)
+        if log.decided_by_moves() and ending_of(status, msg) != log.ending:
+            mismatches += 1
+    seconds = perf_counter() - start
+    print(
+        f"Replayed {games} games ({moves} moves) in {seconds:.3f}s; "
+        f"{mismatches} ended differently than recorded, {unknown} were on unknown tracks"
+    )
+
+
+if __name__ == "__main__":
+    main()
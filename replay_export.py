@@ -0,0 +1,89 @@
+import argparse
+import os
+
+from game import Game, Point, Status, interpolate, replay_player_generator
+from game_world.racetrack import RaceTrack, load_track
+from tournament import load_player
+
+FRAMES_PER_MOVE = 4  # 1 for just the positions, more for smooth in-between frames
+
+
+def export_replay(
+    track: RaceTrack,
+    history: list[Point],
+    out_dir: str,
+    frames_per_move: int = FRAMES_PER_MOVE,
+) -> int:
+    """
+    Write a replay as a numbered PNG sequence, as fast as it can be drawn.
+    Nothing is shown on screen: pygame runs with the dummy video driver unless another is set.
+    Each track state is rendered once; the frames in between are that picture with the
+    racer drawn on top.
+
+    Args:
+        track (RaceTrack): The track the game was played on.
+        history (list[Point]): The moves the racer made (Game.history). Not modified.
+        out_dir (str): The directory to write frame_00000.png, frame_00001.png... into.
+        frames_per_move (int, optional): Frames drawn for each move. Defaults to FRAMES_PER_MOVE.
+
+    Returns:
+        int: How many frames were written.
+    """
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+    import pygame
+
+    pygame.init()
+    # The sprites need a display format to convert to, even a dummy one.
+    pygame.display.set_mode((1, 1))
+    os.makedirs(out_dir, exist_ok=True)
+    cell_w = track.screen_size[0] / track.shape[1]
+    cell_h = track.screen_size[1] / track.shape[0]
+    radius = 0.2 * min(cell_w, cell_h)
+
+    game = Game(replay_player_generator(history), track, float("inf"), 0)
+    frame = pygame.Surface(track.screen_size)
+    count = 0
+
+    def write_frame(background: pygame.Surface, location: tuple[float, float]) -> None:
+        nonlocal count
+        x, y = (location[1] + 0.5) * cell_w, (location[0] + 0.5) * cell_h
+        frame.blit(background, (0, 0))
+        pygame.draw.circle(frame, "#000000", (x, y), radius)
+        pygame.draw.circle(frame, "#FFFFFF", (x, y), radius, 2)
+        pygame.image.save(frame, os.path.join(out_dir, f"frame_{count:05d}.png"))
+        count += 1
+
+    write_frame(game.track.render(), game.pos)
+    status = Status.ONGOING
+    for _ in range(len(history)):
+        if status != Status.ONGOING:
+            break
+        move_start = game.pos
+        status, _ = game.tick()
+        background = game.track.render()
+        for i in range(1, frames_per_move + 1):
+            write_frame(background, interpolate(move_start, game.pos, i / frames_per_move))
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play a game and save its replay as PNG frames.")
+    parser.add_argument("--player", default="serena_bot:act", help="module:function spec")
+    parser.add_argument("--track", default="tracks/your_room.pkl")
+    parser.add_argument("--out", default="replay_frames")
+    parser.add_argument("--frames-per-move", type=int, default=FRAMES_PER_MOVE)
+    parser.add_argument("--time", type=float, default=10)
+    parser.add_argument("--delay", type=float, default=5)
+    args = parser.parse_args()
+
+    track = load_track(args.track)
+    game = Game(load_player(args.player), track, args.time, args.delay)
+    _, msg = game.play_game()
+    print(msg)
+    count = export_replay(track, game.history, args.out, args.frames_per_move)
+    print(f"Wrote {count} frames to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
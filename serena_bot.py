@@ -1,28 +1,23 @@
 import heapq
-import copy
+from time import monotonic
+from game_world.hierarchy import HierarchicalPathfinder
+from game_world.planner import AnytimePlanner, BackgroundPlanner, plan
 from game_world.racetrack import RaceTrack
 from collections import defaultdict
-from collections import deque
-from copy import deepcopy
-
-"""
-    Note: This only works for tracks that don't have buttons. I suspect that astar is taking the final
-    target (track.target) as the target instead of the next button as the target. Unfortunately, due to
-    squash nationals (I've learned I can't work on a bus unless I want motion sickness) I couldn't finish
-    debugging before the deadline.
-"""
 
 Point = tuple[int, int]
-button_path = None
-
-class State:
+# planned moves for each track fingerprint, keyed by (position, toggle state)
+plan_cache: dict[str, dict[tuple[Point, int], Point]] = {}
+# resumable search for act_anytime, kept only for the track being raced (by fingerprint);
+# each holds a few arrays the size of the track times its toggle states
+anytime_planners: dict[str, AnytimePlanner] = {}
+# search for act_background, which carries on in a worker thread between ticks; also
+# only kept for the track being raced, and its worker is stopped when the track changes
+background_planners: dict[str, BackgroundPlanner] = {}
+# cluster abstractions for hpa, one per track fingerprint
+pathfinders: dict[str, HierarchicalPathfinder] = {}
+TICK_TIME = 0.5  # most seconds act_anytime and act_background will think about one move
 
-    def __init__(self, track: RaceTrack, parent: RaceTrack, prev_button: set):
-        self.parent = parent
-        self.prev_button = prev_button
-        self.track = track
-        self.pos = track.spawn
-        self.frontier = []
 
 def manhattan_dist(a: Point, b: Point) -> int:
     return abs(a[0] - b[0]) + abs(a[1] - b[1])
@@ -32,14 +27,10 @@ def find_valid_neighbors(a: Point):
     neighbors = [(a[0] - 1, a[1]), (a[0], a[1] - 1), (a[0] + 1, a[1]), (a[0], a[1] + 1)]
     return neighbors
 
-def make_move(track: RaceTrack, button: int): #int = color
-        #makes new board of after move
-        new_track = copy.deepcopy(track)
-        new_track.toggle(button)
-        return new_track
-
-
-def astar(start: Point, end: Point, track: RaceTrack) -> list[Point] | None:
+def astar(
+    start: Point, end: Point, track: RaceTrack, stats: dict[str, int] | None = None
+) -> list[Point] | None:
+        # stats, if given, gets the number of cells expanded under "expanded"
         start_cell, end_cell = start, end
         closed_list = set()
         if not start_cell or not end_cell:
@@ -57,7 +48,7 @@ def astar(start: Point, end: Point, track: RaceTrack) -> list[Point] | None:
             if current_cell == end_cell:
                 break
             for neighbor in find_valid_neighbors(current_cell):
-                if not neighbor in track.find_traversable_cells():
+                if not track.is_traversable(*neighbor):
                     continue
 
                 if neighbor in closed_list:
@@ -73,6 +64,8 @@ def astar(start: Point, end: Point, track: RaceTrack) -> list[Point] | None:
 
             closed_list.add(current_cell)
 
+        if stats is not None:
+            stats["expanded"] = len(closed_list)
         path = []
         key = end_cell
         while key != None:
@@ -81,66 +74,73 @@ def astar(start: Point, end: Point, track: RaceTrack) -> list[Point] | None:
         return path[::-1]
 
 
-def bfs(curr: State, track: RaceTrack):
-        #finds all visitable cells
-        frontier = deque([curr.pos])
-        visited = set([curr.pos])
-        
-        while frontier:
-            current = frontier.popleft()
-
-            for neighbor in find_valid_neighbors(current):
-                if (neighbor in track.find_traversable_cells() and neighbor not in visited):
-                    visited.add(neighbor)
-                    frontier.append(neighbor)
-        return visited
-
-
-def goal_state(curr: State, track: RaceTrack) -> bool:
-        #checks if state is goal state
-        for x, y in astar(curr.pos, track.target, track):
-            if track.buttons[x][y] == 0: #no button in the way
-                return True
-        return False
-
-
-def check_state(curr: State, track: RaceTrack, frontier: list):
-    if goal_state(curr, track):
-        return track
-    for button in track.find_buttons(None):
-        if button in bfs(curr, track):
-            child = State(make_move(track, button), curr, button)
-            frontier.append(child)
-    return None
-
-
-def main(track: RaceTrack):
-    b_path = []
-    root = State(track, None, None)
-    frontier = [root]
-    current = root
-    while frontier:
-        current = frontier.pop()
-        if check_state(current, current.track, frontier) is not None:
-             break
-
-    # retrace my steps to root
-    while current.parent != None:
-        b_path.append(current.prev_button)
-        current = current.parent
-
-    return b_path[::-1]
+def hpa(start: Point, end: Point, track: RaceTrack) -> list[Point] | None:
+    # same answer shape as astar, but long paths are found between cluster entrances
+    # first, and the clusters' work is kept for the next query
+    fingerprint = track.fingerprint()
+    if fingerprint not in pathfinders:
+        pathfinders[fingerprint] = HierarchicalPathfinder(track)
+    return pathfinders[fingerprint].find_path(start, end, track.state)
+
+
+def main(track: RaceTrack, loc: Point | None = None) -> list[Point] | None:
+    # shortest moves to the target, searching over (cell, toggled colors) states
+    return plan(track, loc)
+
+
+def remember_plan(
+    cache: dict[tuple[Point, int], Point], track: RaceTrack, loc: Point, moves: list[Point]
+):
+    # walk the plan forward so each move is stored under the state we'll see it in
+    state = track.state
+    for move in moves:
+        cache[(loc, state)] = move
+        if track.buttons[loc]:
+            state ^= 1 << int(track.button_colors[loc])
+        loc = (loc[0] + move[0], loc[1] + move[1])
+
 
 def act(loc: Point, track: RaceTrack):
-    button_path = main(track)
-    if button_path is None:
-         button_path = main(track)
-    if not button_path:
-         step = astar(loc, track.target, track)[1]
-         return (step[0]-loc[0], step[1]-loc[1])
-    next_button = button_path[0]
-    if loc == next_button:
-         button_path.pop(0)
-    path = astar(loc, next_button, track)
-    step = path[1]
-    return (step[0]-loc[0], step[1]-loc[1])
+    cache = plan_cache.setdefault(track.fingerprint(), {})
+    key = (loc, track.state)
+    if key not in cache:
+        # first tick, or we ended up somewhere the plan didn't expect
+        moves = main(track, loc)
+        if not moves:
+            return (0, 0)
+        remember_plan(cache, track, loc, moves)
+    return cache[key]
+
+
+def act_anytime(loc: Point, track: RaceTrack):
+    # think for a slice of the time we have left, then go with the best move so far;
+    # the search carries on from where it stopped next tick
+    fingerprint = track.fingerprint()
+    if fingerprint not in anytime_planners:
+        anytime_planners.clear()
+        anytime_planners[fingerprint] = AnytimePlanner(track)
+    return anytime_planners[fingerprint].best_move(loc, track.state, thinking_deadline(track))
+
+
+def act_background(loc: Point, track: RaceTrack):
+    # like act_anytime, but the search keeps going while the engine does its part,
+    # and the move for where we'll be next is usually ready before we're asked
+    fingerprint = track.fingerprint()
+    if fingerprint not in background_planners:
+        # a new track, so the last one's worker would only take time from this race
+        stop_background_planners()
+        background_planners[fingerprint] = BackgroundPlanner(track)
+    return background_planners[fingerprint].move(loc, track.state, thinking_deadline(track))
+
+
+def stop_background_planners():
+    # stop act_background's worker and let go of its search, e.g. once a game is over
+    for planner in background_planners.values():
+        planner.stop()
+    background_planners.clear()
+
+
+def thinking_deadline(track: RaceTrack) -> float:
+    # a slice of whatever time the engine says we have left
+    time_left = TICK_TIME if track.time_left is None else track.time_left
+    return monotonic() + min(TICK_TIME, time_left / 10)
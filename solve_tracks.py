@@ -0,0 +1,142 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import glob
+import json
+import os
+
+from game import Game, Point, Status, manhattan_dist, replay_player_generator
+from game_world.planner import plan
+from game_world.racetrack import load_track
+
+TRACKS = "tracks"
+TRACK_PATTERNS = ("*.pkl", "*.track")
+EXTENSION = ".solution.json"
+
+
+def solution_file(track_file: str) -> str:
+    """Where a track's par and solution are kept: next to it, as <name>.solution.json."""
+    return os.path.splitext(track_file)[0] + EXTENSION
+
+
+def load_solution(track_file: str) -> dict | None:
+    """
+    Read a track's stored solution.
+
+    Returns:
+        dict | None: The record solve() wrote, or None if there isn't one or the track
+            has changed since it was solved.
+    """
+    try:
+        with open(solution_file(track_file)) as f:
+            record = json.load(f)
+    except FileNotFoundError:
+        return None
+    if record["fingerprint"] != load_track(track_file).fingerprint():
+        return None
+    return record
+
+
+def load_par(track_file: str) -> int | None:
+    """The optimal number of moves for a track, if it has been solved and can be finished."""
+    record = load_solution(track_file)
+    return None if record is None else record["par"]
+
+
+def longest_dawdle(start: Point, target: Point, moves: list[Point]) -> int:
+    """
+    The most moves in a row that don't bring a racer closer to target than ever before,
+    counted the way Game does.
+    """
+    pos, best, run, longest = start, float("inf"), 0, 0
+    for move in moves:
+        pos = (pos[0] + move[0], pos[1] + move[1])
+        dist = manhattan_dist(pos, target)
+        run = 0 if dist < best else run + 1
+        best, longest = min(best, dist), max(longest, run)
+    return longest
+
+
+def solve(track_file: str) -> dict:
+    """
+    Find an optimal solution for a track, check it by playing it through Game, and
+    save it next to the track.
+
+    Returns:
+        dict: The saved record: the track's fingerprint, its par (None if the target
+            can't be reached), the solution as a list of [row, col] moves, and the most
+            turns in a row it goes without progress.
+    """
+    track = load_track(track_file)
+    moves = plan(track)
+    if moves is not None:
+        game = Game(
+            replay_player_generator(list(moves)), track, float("inf"), 0, len(moves) + 1
+        )
+        status, msg = game.play_game()
+        if status != Status.FINISH or len(game.history) != len(moves):
+            raise RuntimeError(f"The solution for {track_file} didn't replay: {msg}")
+    record = {
+        "fingerprint": track.fingerprint(),
+        "par": None if moves is None else len(moves),
+        "solution": [] if moves is None else [list(move) for move in moves],
+        # a Game with a lower max_turns_without_progress would call this dawdling
+        "longest_dawdle": (
+            0 if moves is None else longest_dawdle(track.spawn, track.target, moves)
+        ),
+    }
+    with open(solution_file(track_file), "w") as f:
+        json.dump(record, f)
+    return record
+
+
+def find_tracks(paths: list[str]) -> list[str]:
+    """Every track file among paths, looking inside any directories."""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            for pattern in TRACK_PATTERNS:
+                found += sorted(glob.glob(os.path.join(path, pattern)))
+        else:
+            found.append(path)
+    return found
+
+
+def solve_all(
+    track_files: list[str], workers: int | None = None, force: bool = False
+) -> dict[str, int | None]:
+    """
+    Solve tracks in parallel, one per process, skipping any with an up to date solution
+    unless force is set.
+
+    Returns:
+        dict[str, int | None]: Each track's par.
+    """
+    pars = {}
+    todo = []
+    for track_file in track_files:
+        record = None if force else load_solution(track_file)
+        if record is None:
+            todo.append(track_file)
+        else:
+            pars[track_file] = record["par"]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for track_file, record in zip(todo, pool.map(solve, todo)):
+            pars[track_file] = record["par"]
+    return {track_file: pars[track_file] for track_file in track_files}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Work out each track's optimal number of moves (par) and save a solution next to it."
+    )
+    parser.add_argument("paths", nargs="*", default=[TRACKS], help="track files or directories")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--force", action="store_true", help="re-solve tracks already solved")
+    args = parser.parse_args()
+    pars = solve_all(find_tracks(args.paths), args.workers, args.force)
+    for track_file, par in pars.items():
+        print(f"{track_file}: {'unsolvable' if par is None else f'par {par}'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+import glob
+import importlib
+from itertools import product
+import signal
+from time import monotonic
+
+from game import Game, Player, Status
+from game_world.racetrack import load_track
+from move_log import WALL_CLOCK_EXCEEDED, MoveLog, save_archive
+from solve_tracks import load_par
+
+TRACKS = "tracks/*.pkl"
+PLAYERS = ["serena_bot:act", "random_bot:random_move"]
+TIME = 10  # seconds of thinking time each racer starts with
+DELAY = 5  # seconds refunded per tick, like Game's delay
+WALL_CLOCK = 60  # hard limit on the real time one game may take
+
+
+class WallClockExceeded(BaseException):
+    """
+    Raised inside a worker when a game runs past its wall-clock limit.
+    Not an Exception, so Game.tick can't mistake it for the racer crashing.
+    """
+
+
+@dataclass
+class GameResult:
+    player: str
+    track: str
+    status: str
+    message: str
+    steps: int
+    seconds: float
+    par: int | None = None  # the track's optimal move count, if solve_tracks has run on it
+    log: bytes = field(default=b"", repr=False)  # the game's MoveLog, as to_bytes() gives it
+
+    @property
+    def ratio(self) -> float | None:
+        """Steps taken over par for a finished game, so 1.0 is optimal."""
+        if self.status != Status.FINISH.name or not self.par:
+            return None
+        return self.steps / self.par
+
+
+def player_name(player: Player) -> str:
+    return f"{player.__module__}:{player.__qualname__}"
+
+
+def load_player(spec: str) -> Player:
+    """Import a player from a 'module:function' string, e.g. 'serena_bot:act'."""
+    module, _, name = spec.partition(":")
+    return getattr(importlib.import_module(module), name)
+
+
+def _on_alarm(signum, frame):
+    raise WallClockExceeded()
+
+
+def run_game(
+    player: Player, track_file: str, time: float, delay: float, wall_clock: float
+) -> GameResult:
+    """
+    Play one game start to finish without any display.
+    Runs in a worker process, so the player must be picklable (a module level function).
+    """
+    game = Game(player, load_track(track_file), time, delay)
+    status, msg = Status.ONGOING, "Just Started."
+    start = monotonic()
+    # The alarm interrupts a racer stuck inside a single tick; the loop check below
+    # covers platforms without setitimer.
+    has_alarm = hasattr(signal, "setitimer")
+    if has_alarm:
+        signal.signal(signal.SIGALRM, _on_alarm)
+        signal.setitimer(signal.ITIMER_REAL, wall_clock)
+    try:
+        while status == Status.ONGOING:
+            if monotonic() - start > wall_clock:
+                raise WallClockExceeded()
+            status, msg = game.tick()
+    except WallClockExceeded:
+        status, msg = Status.DNF, WALL_CLOCK_EXCEEDED.format(wall_clock)
+    finally:
+        if has_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    return GameResult(
+        player_name(player),
+        track_file,
+        status.name,
+        msg.strip().splitlines()[-1],
+        len(game.history),
+        monotonic() - start,
+        load_par(track_file),
+        MoveLog.from_game(game, status, msg).to_bytes(),
+    )
+
+
+def run_tournament(
+    players: list[Player],
+    track_files: list[str],
+    time: float = TIME,
+    delay: float = DELAY,
+    wall_clock: float = WALL_CLOCK,
+    workers: int | None = None,
+) -> list[GameResult]:
+    """
+    Play every player on every track, one game per process.
+
+    Args:
+        players (list[Player]): Module level player functions.
+        track_files (list[str]): Paths of the tracks to race on.
+        time (float, optional): Thinking time each racer starts with. Defaults to TIME.
+        delay (float, optional): Thinking time refunded per tick. Defaults to DELAY.
+        wall_clock (float, optional): Real seconds a game may take before it's a DNF. Defaults to WALL_CLOCK.
+        workers (int | None, optional): Number of processes. Defaults to None - one per core.
+
+    Returns:
+        list[GameResult]: One result per (player, track) pair, in the order given.
+    """
+    games = list(product(players, track_files))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(run_game, player, track, time, delay, wall_clock)
+            for player, track in games
+        ]
+        return [future.result() for future in futures]
+
+
+def format_results(results: list[GameResult]) -> str:
+    """Lay results out as a plain text table, with a summary row per player."""
+    header = ("player", "track", "status", "steps", "par", "ratio", "seconds", "message")
+    rows = [
+        (
+            r.player,
+            r.track,
+            r.status,
+            str(r.steps),
+            "-" if r.par is None else str(r.par),
+            "-" if r.ratio is None else f"{r.ratio:.2f}",
+            f"{r.seconds:.3f}",
+            r.message,
+        )
+        for r in results
+    ]
+    for player in dict.fromkeys(r.player for r in results):
+        mine = [r for r in results if r.player == player]
+        finished = [r for r in mine if r.status == Status.FINISH.name]
+        ratios = [r.ratio for r in finished if r.ratio is not None]
+        rows.append(
+            (
+                player,
+                "(total)",
+                f"{len(finished)}/{len(mine)} finished",
+                str(sum(r.steps for r in finished)),
+                "",
+                f"{sum(ratios) / len(ratios):.2f} mean" if ratios else "-",
+                f"{sum(r.seconds for r in mine):.3f}",
+                "",
+            )
+        )
+    widths = [max(len(row[i]) for row in [header, *rows]) for i in range(len(header))]
+    lines = ["  ".join(cell.ljust(w) for cell, w in zip(row, widths)) for row in [header, *rows]]
+    lines.insert(1, "  ".join("-" * w for w in widths))
+    return "\n".join(line.rstrip() for line in lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Race every player on every track.")
+    parser.add_argument("--players", nargs="+", default=PLAYERS, help="module:function specs")
+    parser.add_argument("--tracks", nargs="+", default=sorted(glob.glob(TRACKS)))
+    parser.add_argument("--time", type=float, default=TIME)
+    parser.add_argument("--delay", type=float, default=DELAY)
+    parser.add_argument("--wall-clock", type=float, default=WALL_CLOCK)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--archive", help="file to save every game's move log in")
+    args = parser.parse_args()
+    players = [load_player(spec) for spec in args.players]
+    results = run_tournament(
+        players, args.tracks, args.time, args.delay, args.wall_clock, args.workers
+    )
+    print(format_results(results))
+    if args.archive:
+        save_archive(args.archive, (MoveLog.from_bytes(r.log)[0] for r in results))
+        print(f"Saved {len(results)} move logs to {args.archive}")
+
+
+if __name__ == "__main__":
+    main()